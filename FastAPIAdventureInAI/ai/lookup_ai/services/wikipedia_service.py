@@ -10,6 +10,7 @@ The implementation uses blocking stdlib HTTP calls wrapped with
 """
 from typing import Optional, Dict, Any
 import asyncio
+import json
 import re
 import html as _html
 from urllib import parse, request
@@ -39,8 +40,6 @@ async def _fetch_query_extract(title: str) -> Optional[str]:
         try:
             req = request.Request(url, headers={"User-Agent": "FastAPIAdventureInAI/1.0"})
             with request.urlopen(req, timeout=10) as resp:
-                import json
-
                 return json.loads(resp.read().decode("utf-8", errors="ignore"))
         except Exception as e:
             print(f"[wikipedia_service] _fetch_query_extract: request failed: {e}")
@@ -108,8 +107,6 @@ async def fetch_wikipedia_excerpt(url: str) -> Optional[str]:
             def _get_json():
                 req = request.Request(api_url, headers={"User-Agent": "FastAPIAdventureInAI/1.0"})
                 with request.urlopen(req, timeout=8) as resp:
-                    import json
-
                     return json.loads(resp.read().decode("utf-8", errors="ignore"))
 
             try:
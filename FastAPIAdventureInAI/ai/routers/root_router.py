@@ -1,6 +1,7 @@
 #import asyncio
 #import uvicorn
 import random
+import re
 from typing import Tuple
 from fastapi import APIRouter, Request, Depends#, HTTPException, status
 #from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -22,9 +23,10 @@ from config import CORS_ORIGINS, SECRET_KEY, ALGORITHM
 
 from ai.schemas_ai_server import *
 #from ai.services.lookup_ai_service import describe_entity_ai
-from ai.services.ai_api_service import perform_deep_summarize_chunk, perform_count_tokens, flatten_json_prompt
+from ai.services.ai_api_service import perform_deep_summarize_chunk, perform_count_tokens, flatten_json_prompt, count_text_tokens
 from ai.services.ai_modeler_service import load_story_generater_to_app_state, get_model
 from shared.helpers.ai_settings import get_ai_settings, get_user_ai_settings
+from aiadventureinpythonconstants import compile_stop_tokens
 from shared.services.auth_service import verify_token, get_current_user
 from shared.services.orm_service import get_db
 
@@ -54,6 +56,8 @@ async def generate_from_game(request: GenerateFromGameRequest, user=Depends(get_
     # """
     generator, tokenizer = model_and_tokenizer
     settings = get_user_ai_settings(user.id)
+    RESERVED_FOR_GENERATION = settings.get("RESERVED_FOR_GENERATION", 150)
+    STOP_TOKENS_RE = settings.get("STOP_TOKENS_RE") or compile_stop_tokens(settings.get("STOP_TOKENS", ()))
     # Set random seed for reproducibility
     set_seed(random.randint(0, 2**32 - 1))
     
@@ -98,24 +102,27 @@ async def generate_from_game(request: GenerateFromGameRequest, user=Depends(get_
         output = await run_in_threadpool(
             lambda: generator.generate(
                 **inputs,
-                max_new_tokens=settings.get("RESERVED_FOR_GENERATION", 150),
+                max_new_tokens=RESERVED_FOR_GENERATION,
                 num_return_sequences=1,
                 temperature=0.8,
                 top_p=0.6,
-                repetition_penalty=1.2
+                repetition_penalty=1.2,
+                return_dict_in_generate=True,
+                output_scores=False
             )
         )
-        # Decode only the newly generated tokens, not the prompt
-        generated_tokens = output[0][prompt_token_count:]
-        text = tokenizer.decode(generated_tokens, skip_special_tokens=True)
+        # Decode only the newly generated tokens, slicing on device before the copy to host
+        generated_tokens = output.sequences[0, prompt_token_count:].cpu()
+        text = tokenizer.decode(generated_tokens, skip_special_tokens=True, clean_up_tokenization_spaces=False)
 
-        # Remove lines starting with any stop token
-        for stop_token in settings.get("STOP_TOKENS", ""):
-            if text.strip().startswith(stop_token):
-                text = text.strip()[len(stop_token):].lstrip()
+        # Remove any stop tokens the reply starts with
+        text = text.strip()
+        stop_match = STOP_TOKENS_RE.match(text)
+        while stop_match:
+            text = text[stop_match.end():].lstrip()
+            stop_match = STOP_TOKENS_RE.match(text)
 
         # Remove entire lines containing chapter markers (e.g., "Chapter 1.2.3:" or "1.2.5:" or "1.2:")
-        import re
         # Remove lines like "Chapter 1.2.3:" or "Chapter 1.2:"
         text = re.sub(r'^\s*Chapter\s+\d+\.\d+(\.\d+)?:\s*$', '', text, flags=re.MULTILINE | re.IGNORECASE)
         # Remove lines like "1.2.5:" or "1.2:" at the start of a line
@@ -147,6 +154,7 @@ async def summarize_chunk(request: SummarizeChunkRequest, user=Depends(get_curre
     previous_summary = request.previous_summary
     
     settings = get_user_ai_settings(user.id)
+    SUMMARY_SPLIT_MARKER = settings.get("SUMMARY_SPLIT_MARKER", "<<<SPLIT_MARKER>>>")
 
     # Build context-aware prompt header
     prompt_parts = [
@@ -179,10 +187,10 @@ async def summarize_chunk(request: SummarizeChunkRequest, user=Depends(get_curre
     
     # Build the header to count its tokens
     header = "".join(prompt_parts)
-    footer = f"\n\n{settings.get('SUMMARY_SPLIT_MARKER', '<<<SPLIT_MARKER>>>')}\n"
+    footer = f"\n\n{SUMMARY_SPLIT_MARKER}\n"
     
-    header_tokens = len(tokenizer.encode(header))
-    footer_tokens = len(tokenizer.encode(footer))
+    header_tokens = count_text_tokens(tokenizer, header)
+    footer_tokens = count_text_tokens(tokenizer, footer)
     reserved_tokens = max_tokens  # Reserve space for the summary output
     
     # Calculate available budget for chunk content
@@ -192,7 +200,7 @@ async def summarize_chunk(request: SummarizeChunkRequest, user=Depends(get_curre
     chunk_text_parts = []
     for entry in chunk:
         entry_text = entry.strip() + "\n"
-        entry_tokens = len(tokenizer.encode(entry_text))
+        entry_tokens = count_text_tokens(tokenizer, entry_text)
         
         if entry_tokens <= available_tokens:
             chunk_text_parts.append(entry_text)
@@ -205,7 +213,7 @@ async def summarize_chunk(request: SummarizeChunkRequest, user=Depends(get_curre
                 truncated = ""
                 for word in words:
                     test_text = truncated + " " + word if truncated else word
-                    test_tokens = len(tokenizer.encode(test_text))
+                    test_tokens = count_text_tokens(tokenizer, test_text)
                     if test_tokens <= available_tokens:
                         truncated = test_text
                     else:
@@ -217,7 +225,7 @@ async def summarize_chunk(request: SummarizeChunkRequest, user=Depends(get_curre
     prompt = header + "".join(chunk_text_parts) + footer
     
     # Log the token count
-    final_tokens = len(tokenizer.encode(prompt))
+    final_tokens = count_text_tokens(tokenizer, prompt)
     # print(f"\n[Summarize Token Budget] Prompt: {final_tokens} tokens (limit: {settings.get('SAFE_PROMPT_LIMIT', 3900)})")
     # print(f"[Summarize Token Budget] Chunk entries included: {len(chunk_text_parts)}/{len(chunk)}")
     
@@ -236,25 +244,31 @@ async def summarize_chunk(request: SummarizeChunkRequest, user=Depends(get_curre
             num_return_sequences=1,
             temperature=0.2,
             top_p=0.90,
-            repetition_penalty=1.1
+            repetition_penalty=1.1,
+            return_dict_in_generate=True,
+            output_scores=False
         )
     )
-    summary_text = tokenizer.decode(summary_output[0], skip_special_tokens=True)
+    # Decode only the summary tokens; the prompt is never round-tripped through decode
+    summary_tokens = summary_output.sequences[0, inputs.input_ids.shape[-1]:].cpu()
+    summary_text = tokenizer.decode(summary_tokens, skip_special_tokens=True, clean_up_tokenization_spaces=False)
 
-    # Strip everything before the marker
-    if settings.get("SUMMARY_SPLIT_MARKER", "<<<SPLIT_MARKER>>>") in summary_text:
-        summary_text = summary_text.split(settings.get("SUMMARY_SPLIT_MARKER", "<<<SPLIT_MARKER>>>"))[-1]
+    # Strip everything before the marker (only needed if the model echoes it back)
+    if SUMMARY_SPLIT_MARKER in summary_text:
+        summary_text = summary_text.split(SUMMARY_SPLIT_MARKER)[-1]
 
     summary_text = summary_text.strip()
+    # Counted the same way as /tokens/count_tokens_batch/, so the caller can skip that round trip
+    token_count = count_text_tokens(tokenizer, summary_text)
     
     print("\n" + "="*80)
     print("SUMMARIZE_CHUNK - AI RESPONSE (after split marker removal):")
     print("="*80)
     print(summary_text)
-    print(f"Token count: {len(tokenizer.encode(summary_text, add_special_tokens=False))}")
+    print(f"Token count: {token_count}")
     print("="*80 + "\n")
 
-    return {"summary": summary_text}
+    return {"summary": summary_text, "token_count": token_count}
 
 
 @router.post("/deep_summarize_chunk/")
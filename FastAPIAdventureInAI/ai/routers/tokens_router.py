@@ -7,7 +7,7 @@ from fastapi.requests import Request
 from typing import Tuple
 from shared.services.auth_service import verify_token
 from ai.services.ai_modeler_service import get_model
-from ai.services.ai_api_service import perform_count_tokens
+from ai.services.ai_api_service import perform_count_tokens, count_text_tokens_batch
 
 router = APIRouter(tags=["authentication"])
 
@@ -23,9 +23,4 @@ async def count_tokens_batch(request: Request, username: str = Depends(verify_to
     body = await request.json()
     texts = body.get("texts", [])
     
-    token_counts = []
-    for text in texts:
-        tokens = tokenizer.encode(text)
-        token_counts.append(len(tokens))
-    
-    return {"token_counts": token_counts}
\ No newline at end of file
+    return {"token_counts": count_text_tokens_batch(tokenizer, texts)}
\ No newline at end of file
@@ -10,12 +10,32 @@ from config import CORS_ORIGINS, SECRET_KEY, ALGORITHM
 from shared.helpers.memory_helper import get_recent_memories
 from shared.helpers.ai_settings import get_ai_settings, get_user_ai_settings
 
-    
+
+def count_text_tokens(STORY_TOKENIZER, text: str, add_special_tokens: bool = True) -> int:
+    """Return the token length of text without building the full HF encoding."""
+    return count_text_tokens_batch(STORY_TOKENIZER, [text], add_special_tokens)[0]
+
+def count_text_tokens_batch(STORY_TOKENIZER, texts, add_special_tokens: bool = True):
+    """
+    Return token lengths for many texts in one call.
+    Fast tokenizers expose the rust backend as `_tokenizer`; calling it directly
+    skips the Python-side pre/post processing that `encode()` does when only
+    the length is needed. Slow tokenizers fall back to `encode()`.
+    """
+    backend = getattr(STORY_TOKENIZER, "_tokenizer", None)
+    if backend is None:
+        return [len(STORY_TOKENIZER.encode(text, add_special_tokens=add_special_tokens)) for text in texts]
+    encodings = backend.encode_batch(list(texts), add_special_tokens=add_special_tokens)
+    return [len(encoding.ids) for encoding in encodings]
+
+
 def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
     """Build optimized prompt from structured game data with token budget enforcement."""
     recent_story = json_data.get("RecentStory", [])
     tokenized_history = json_data.get("TokenizedHistory", [])
     deep_memory = json_data.get("DeepMemory")  # Ultra-compressed ancient history
+    SAFE_PROMPT_LIMIT = settings.get("SAFE_PROMPT_LIMIT", 3900)
+    MAX_TOKENIZED_HISTORY_BLOCK = settings.get("MAX_TOKENIZED_HISTORY_BLOCK", 4)
 
     # Core directives and context
     prompt = (
@@ -28,7 +48,7 @@ def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
     )
     
     # Count tokens in base prompt
-    base_tokens = len(STORY_TOKENIZER.encode(prompt))
+    base_tokens = count_text_tokens(STORY_TOKENIZER, prompt)
     #print(f"[Token Budget] Base prompt: {base_tokens} tokens")
     tokens_used = base_tokens
     
@@ -47,18 +67,18 @@ def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
         action_text = "# No Player Action. Continue the story naturally.\n\n"
     
     action_text += f"{json_data['GameSettings']['StorySplitter']}\n"
-    action_tokens = len(STORY_TOKENIZER.encode(action_text))
+    action_tokens = count_text_tokens(STORY_TOKENIZER, action_text)
     #print(f"[Token Budget] Action section: {action_tokens} tokens")
     tokens_used += action_tokens
     
     # Calculate available budget for history
-    available_tokens = settings.get("SAFE_PROMPT_LIMIT", 3900) - tokens_used
+    available_tokens = SAFE_PROMPT_LIMIT - tokens_used
     
     #print(f"[Token Budget] Available tokens: {available_tokens}")
     # Deep memory (ultra-compressed ancient history)
     if deep_memory and available_tokens > 0:
         deep_section = f"# Ancient History (Major Events):\n{deep_memory.strip()}\n\n"
-        deep_tokens = len(STORY_TOKENIZER.encode(deep_section))
+        deep_tokens = count_text_tokens(STORY_TOKENIZER, deep_section)
         if deep_tokens <= available_tokens:
             prompt += deep_section
             tokens_used += deep_tokens
@@ -69,14 +89,14 @@ def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
     if tokenized_history and available_tokens > 0:
         history_section = "# Past Events:\n"
         # Start with most recent and work backwards until we run out of budget
-        recent_blocks = list(reversed(tokenized_history[-settings.get("MAX_TOKENIZED_HISTORY_BLOCK", 4):]))
+        recent_blocks = list(reversed(tokenized_history[-MAX_TOKENIZED_HISTORY_BLOCK:]))
         blocks_to_include = []       
 
         for block in recent_blocks:
             summary = block.get("summary", "").strip()
             if summary:
                 block_text = f"{summary}\n\n"
-                block_tokens = len(STORY_TOKENIZER.encode(block_text))
+                block_tokens = count_text_tokens(STORY_TOKENIZER, block_text)
                 if block_tokens <= available_tokens:
                     total_block_tokens += block_tokens
                     blocks_to_include.insert(0, block_text)  # Insert at beginning to maintain order
@@ -89,7 +109,7 @@ def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
             prompt += history_section
             for block_text in blocks_to_include:
                 prompt += block_text
-            tokens_used = settings.get("SAFE_PROMPT_LIMIT", 3900) - available_tokens
+            tokens_used = SAFE_PROMPT_LIMIT - available_tokens
 
     #print(f"[Token Budget] After deep memory and compressed history: {tokens_used} tokens used, {available_tokens} tokens left.")
     
@@ -103,7 +123,7 @@ def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
         
         for entry in recent_entries:
             entry_text = f"{entry.strip()}\n\n"
-            entry_tokens = len(STORY_TOKENIZER.encode(entry_text))
+            entry_tokens = count_text_tokens(STORY_TOKENIZER, entry_text)
             if entry_tokens <= available_tokens:
                 total_entry_tokens += entry_tokens
                 entries_to_include.insert(0, entry_text)  # Insert at beginning to maintain order
@@ -120,8 +140,8 @@ def flatten_json_prompt(json_data, settings, STORY_TOKENIZER):
     prompt += action_text
     
     # Log final token count for debugging
-    final_tokens = len(STORY_TOKENIZER.encode(prompt))
-    print(f"[Token Budget] Final prompt: {final_tokens} tokens (limit: {settings.get('SAFE_PROMPT_LIMIT', 3901) })")
+    final_tokens = count_text_tokens(STORY_TOKENIZER, prompt)
+    print(f"[Token Budget] Final prompt: {final_tokens} tokens (limit: {SAFE_PROMPT_LIMIT})")
     print(f"[Token Budget] MEMORIES: {total_block_tokens} ACTIONS: {action_tokens} BASE: {base_tokens} RECENT HISTORY: {total_entry_tokens}")
     # if(final_tokens != total_block_tokens + action_tokens + base_tokens + total_entry_tokens):
     #     print(f"Token count mismatch detected! {final_tokens} != {total_block_tokens + action_tokens + base_tokens + total_entry_tokens}")
@@ -255,12 +275,10 @@ def build_structured_json(context, user_input, settings=None):
 # THIS CAN STAY
 async def perform_count_tokens(request: Request, STORY_TOKENIZER):
     """Count tokens in a single text string."""
-    import asyncio
     body = await request.json()
     text = body.get("text", "")
     
-    tokens = STORY_TOKENIZER.encode(text)
-    return {"token_count": len(tokens)}
+    return {"token_count": count_text_tokens(STORY_TOKENIZER, text)}
 
 # THIS CAN STAY
 async def perform_deep_summarize_chunk(request: DeepSummarizeChunkRequest, user: User, STORY_TOKENIZER, STORY_GENERATOR):
@@ -274,7 +292,7 @@ async def perform_deep_summarize_chunk(request: DeepSummarizeChunkRequest, user:
 
     prompt+=f"\n{SUMMARY_SPLIT_MARKER}"
     # Log the token count
-    final_tokens = len(STORY_TOKENIZER.encode(prompt))
+    final_tokens = count_text_tokens(STORY_TOKENIZER, prompt)
     print(f"\n[Summarize Token Budget] Prompt: {final_tokens} tokens (limit: {SAFE_PROMPT_LIMIT})")
     
     # Single attempt - accept whatever concise summary the AI produces
@@ -286,22 +304,28 @@ async def perform_deep_summarize_chunk(request: DeepSummarizeChunkRequest, user:
             num_return_sequences=1,
             temperature=0.5,
             top_p=0.90,
-            repetition_penalty=1.1
+            repetition_penalty=1.1,
+            return_dict_in_generate=True,
+            output_scores=False
         )
     )
-    summary_text = STORY_TOKENIZER.decode(summary_output[0], skip_special_tokens=True)
+    # Decode only the summary tokens; the prompt is never round-tripped through decode
+    summary_tokens = summary_output.sequences[0, inputs.input_ids.shape[-1]:].cpu()
+    summary_text = STORY_TOKENIZER.decode(summary_tokens, skip_special_tokens=True, clean_up_tokenization_spaces=False)
 
-    # Strip everything before the marker
+    # Strip everything before the marker (only needed if the model echoes it back)
     if SUMMARY_SPLIT_MARKER in summary_text:
         summary_text = summary_text.split(SUMMARY_SPLIT_MARKER)[-1]
     
     summary_text = summary_text.strip()
+    # Counted the same way as /tokens/count_tokens_batch/, so the caller can skip that round trip
+    token_count = count_text_tokens(STORY_TOKENIZER, summary_text)
     
     print("\n" + "="*80)
     print("SUMMARIZE_CHUNK - AI RESPONSE (after split marker removal):")
     print("="*80)
     print(summary_text)
-    print(f"Token count: {len(STORY_TOKENIZER.encode(summary_text, add_special_tokens=False))}")
+    print(f"Token count: {token_count}")
     print("="*80 + "\n")
 
-    return {"summary": summary_text}
\ No newline at end of file
+    return {"summary": summary_text, "token_count": token_count}
\ No newline at end of file
@@ -1,3 +1,5 @@
+import contextlib
+import os
 from gptqmodel.models import GPTQModel
 from transformers import AutoTokenizer
 from fastapi import Request
@@ -5,7 +7,6 @@ from fastapi import Request
 AI_MODEL = "TheBloke/MythoMax-L2-13B-GPTQ"
 
 def silent_model_load():
-    import os, contextlib
     with open(os.devnull, 'w') as devnull:
         with contextlib.redirect_stdout(devnull):
             tokenizer = AutoTokenizer.from_pretrained(AI_MODEL, use_fast=True)
@@ -15,7 +15,7 @@ from urllib import parse
 from business.models import User
 from shared.helpers.ai_settings import get_user_ai_settings
 from ai.schemas_ai_server import DeepSummarizeChunkRequest
-from ai.services.ai_api_service import perform_deep_summarize_chunk
+from ai.services.ai_api_service import perform_deep_summarize_chunk, count_text_tokens
 from ai.services.ddgs_service import ddgs_search_urls
 from ai.services.http_service import _strip_html
 from ai.lookup_ai.services.html_store_service import save_html
@@ -150,7 +150,7 @@ async def describe_entity_ai(
     )
 
     try:
-        header_tokens = len(STORY_TOKENIZER.encode(header_text))
+        header_tokens = count_text_tokens(STORY_TOKENIZER, header_text)
     except Exception:
         header_tokens = int(len(header_text) / 4)
 
@@ -166,8 +166,8 @@ async def describe_entity_ai(
         current_body = prefix + "\n\n---\n\n".join(included) if included else prefix
         candidate_body = current_body + ("\n\n---\n\n" if included else "") + text
         try:
-            current_tokens = len(STORY_TOKENIZER.encode(current_body))
-            candidate_tokens = len(STORY_TOKENIZER.encode(candidate_body))
+            current_tokens = count_text_tokens(STORY_TOKENIZER, current_body)
+            candidate_tokens = count_text_tokens(STORY_TOKENIZER, candidate_body)
         except Exception:
             current_tokens = int(len(current_body) / 4)
             candidate_tokens = int(len(candidate_body) / 4)
@@ -1,5 +1,6 @@
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import configuration from environment
@@ -10,7 +11,7 @@ from ai.routers.tokens_router import router as tokens_router
 from ai.routers.lore_router import router as lore_router
 from ai.services.ai_modeler_service import load_story_generater_to_app_state
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 load_story_generater_to_app_state(app)
 
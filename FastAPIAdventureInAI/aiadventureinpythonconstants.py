@@ -1,4 +1,12 @@
-﻿# Game mode data
+﻿import functools
+import json
+import re
+import sys
+import types
+from pathlib import Path
+from typing import NamedTuple
+
+# Game mode data
 GAME_RATINGS = (
     'Family Friendly',
     'Mature',
@@ -10,51 +18,41 @@ GAME_RATING_PROMPTS = (
     "the recent story in cinematic detail with unrestricted content"
 )
 
-# Story setups
-STORY_SETUPS = {
-    "Terminator Nexus": {
-        "preface": (
-            "The Hub flickers with cold blue light, its crystal centerpiece now threaded with streams of binary code. "
-            "Metallic footsteps echo across steel catwalks as T‑800 units patrol silently, their red eyes scanning the crowd. "
-            "Sarah Connor stands near a barricade, her gaze sharp as she checks ammunition, while John Connor coordinates survivors with quiet urgency.\n\n"
-            "From the shadows, a liquid shimmer reveals the T‑1000, its form shifting as it watches with predatory patience. "
-            "Nearby, resistance fighters huddle around salvaged tech, sparks flying as they retrofit weapons from scavenged Skynet parts. "
-            "The hum of plasma rifles mixes with the mechanical whir of endoskeletons, a reminder that this gathering is balanced on the edge of annihilation.\n\n"
-            "'The future is not set,' Sarah mutters, her voice steady. 'But here, every timeline collides.' "
-            "The Hub pulses with paradox, machines and humans locked in a fragile truce as destiny rewrites itself."
-        ),
-        "world_tokens": (
-            "The Nexus unites all Terminator timelines, each echoing humanity’s struggle against Skynet. "
-            "1984 Los Angeles burns under neon shadows, resistance fighters hiding in alleys. "
-            "Judgment Day scars 1997, nuclear fire reshaping the earth. "
-            "Future war zones stretch endlessly, plasma rifles flashing against endoskeleton ranks. "
-            "Artifacts intertwine—time displacement chambers, resistance codes, Skynet cores, liquid metal fragments—each destabilizing the Hub. "
-            "Characters are described with vivid detail—scars etched across faces, leather jackets torn from battle, red optics glowing in the dark. "
-            "Surroundings remain alive—sirens wailing, helicopters circling, sparks raining from broken machines—woven into dialogue and action. "
-            "Interactions reveal tension through gesture, weapon readiness, and whispered prophecy, ensuring the Nexus feels cinematic, layered, and relentless."
-        )
-    },
-    "Mad Max Wasteland": {
-        "preface": (
-            "The Hub’s crystal centerpiece is buried beneath sand, its glow muted by dust storms swirling across rusted metal. "
-            "Engines roar in the distance as war rigs circle the gathering, their spikes gleaming under a blood‑red sky. "
-            "Max stands alone near a wrecked interceptor, his eyes scanning the horizon, while Furiosa grips the wheel of her rig, determination etched into her face.\n\n"
-            "War Boys chant atop jagged scaffolds, their pale bodies painted with symbols of devotion, while scavengers barter fuel and water at makeshift stalls. "
-            "The air reeks of gasoline and sweat, punctuated by the clang of weapons forged from scrap. "
-            "A storm brews, lightning flashing across dunes as the Hub trembles under the weight of survival.\n\n"
-            "'Hope is a rare commodity,' Furiosa growls, her voice cutting through the chaos. "
-            "Here, every alliance is fragile, every resource contested, and every moment a fight to endure."
-        ),
-        "world_tokens": (
-            "The Wasteland unites all Mad Max realms, each echoing survival against scarcity. "
-            "Highways crumble into dust, warlords rule from citadels, and caravans clash across endless dunes. "
-            "Artifacts intertwine—fuel drums, war rigs, steering wheels, bullet caches, water flasks—each symbolizing fragile power. "
-            "Characters are described with vivid detail—grease smeared across faces, leather armor cracked from heat, eyes hollow yet defiant. "
-            "Surroundings remain alive—engines revving, sandstorms howling, banners snapping from war rigs—woven into dialogue and action. "
-            "Interactions reveal desperation through barter, betrayal, and battle cries, ensuring the Wasteland feels cinematic, layered, and unrelenting."
-        )
-    }
-}
+# Shared world_tokens sentences; each setup only supplies the parts that differ
+_CHARACTER_DETAIL_TMPL = "Characters are described with vivid detail—{characters}. "
+_SURROUNDINGS_TMPL = "Surroundings remain alive—{surroundings}—woven into dialogue and action. "
+_INTERACTIONS_TMPL = "Interactions reveal {interactions}, ensuring the {theme} feels cinematic, layered, and {tone}."
+
+def _assemble_world_tokens(parts):
+    """Build the full world_tokens string from a setup's template parts."""
+    return (
+        parts["head"]
+        + _CHARACTER_DETAIL_TMPL.format(**parts)
+        + _SURROUNDINGS_TMPL.format(**parts)
+        + _INTERACTIONS_TMPL.format(**parts)
+    )
+
+# Story setups (raw parts) live in story_setups.json; STORY_SETUPS is built lazily by _load_setups
+_STORY_SETUPS_PATH = Path(__file__).with_name("story_setups.json")
+
+def _intern_fragments(obj):
+    """json object_hook: intern keys and string fragments so repeats across setups share one object."""
+    return {sys.intern(key): sys.intern(value) if isinstance(value, str) else value for key, value in obj.items()}
+
+@functools.lru_cache(maxsize=None)
+def _load_setups():
+    """
+    Build STORY_SETUPS on first access: parse story_setups.json, assemble each world_tokens
+    from its parts and return a read-only view with interned names and keys so handlers cannot mutate it.
+    """
+    raw_setups = json.loads(_STORY_SETUPS_PATH.read_bytes(), object_hook=_intern_fragments)
+    return types.MappingProxyType({
+        name: types.MappingProxyType({
+            "preface": setup["preface"],
+            "world_tokens": sys.intern(_assemble_world_tokens(setup["world_tokens"]))
+        })
+        for name, setup in raw_setups.items()
+    })
 
 
 ################################################################ AI DIRECTIVE CONSTANTS
@@ -77,15 +75,34 @@ STORYTELLER_PROMPT = (
     "• Respect player narrative control in their actions\n"
 )
 
+# Same directives with the bullets, section headers and blank lines trimmed; selected by USE_COMPACT_PROMPT
+STORYTELLER_PROMPT_COMPACT = (
+    "Narrate an interactive text adventure in 3rd person as events unfold.\n"
+    "Write 1-3 short paragraphs that advance the plot through action, dialogue, or discovery.\n"
+    "Describe characters vividly (attire, body language, expressions); keep scenes sensory and cinematic.\n"
+    "Use Past History for context and Recent Story for immediate events; never repeat prior entries.\n"
+    "Transition smoothly; keep canon personalities and appearance in established universes.\n"
+    "Stay within the universe tone and rules, reveal backstory organically, and respect player control of their actions.\n"
+)
+
 GAME_DIRECTIVE = ""  # Removed - redundant with STORYTELLER_PROMPT
 
 SUMMARY_SPLIT_MARKER = "<<<<SUMMARY>>>>"
 
-STOP_TOKENS = [
+STOP_TOKENS = tuple(sys.intern(token) for token in (
     "Narrator:",
     "#",
     "Chapter"
-]
+))
+
+def compile_stop_tokens(tokens):
+    """Compile stop tokens into one alternation regex so a single scan replaces a loop per token."""
+    tokens = [token for token in tokens if token]
+    if not tokens:
+        return re.compile(r"(?!)")  # Never matches
+    return re.compile("|".join(re.escape(token) for token in tokens))
+
+STOP_TOKENS_RE = compile_stop_tokens(STOP_TOKENS)
 
 ############################################ AI DIRECTIVE STORAGE LIMITS
 
@@ -100,7 +117,29 @@ SUMMARY_MIN_TOKEN_PERCENT = 0.5     # Ch Sec Min Token %
 MAX_TOKENS = 4096                   # MythoMax limit
 RESERVED_FOR_GENERATION = 180       # AI Story Token return limit
 SAFE_PROMPT_LIMIT = MAX_TOKENS - RESERVED_FOR_GENERATION
+TOKENIZED_HISTORY_MERGE_LIMIT = (TOKENIZED_HISTORY_BLOCK_SIZE * 3 + 3) >> 2          # ceil(75% of block size); chunks below this get merged into
 MAX_WORLD_TOKENS = 1000             # Maximum tokens allowed for world (name + preface + world_tokens)
 
+class Setup(NamedTuple):
+    name: str
+    preface: str
+    world_tokens: str
+
+@functools.lru_cache(maxsize=None)
+def _load_setups_tuple():
+    """Flatten STORY_SETUPS into a tuple of Setup records in definition order."""
+    return tuple(
+        Setup(name, setup["preface"], setup["world_tokens"])
+        for name, setup in _load_setups().items()
+    )
+
+def __getattr__(name):
+    """Lazily resolve the STORY_SETUPS views on first access (PEP 562)."""
+    if name == "STORY_SETUPS":
+        return _load_setups()
+    if name == "STORY_SETUPS_TUPLE":
+        return _load_setups_tuple()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 ########################################### SERVER URLS
 
@@ -1,16 +1,64 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+import httpx
+import orjson
 import requests
-import jwt
 import os
-from config import SECRET_KEY, ALGORITHM, AI_SERVER_URL
-from business.converters import serialize_for_json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import AI_SERVER_URL
+from shared.helpers.jwt_helper import encode_token
 
+logger = logging.getLogger(__name__)
+
+# Shared session so back-to-back AI calls reuse pooled keep-alive connections
+# instead of opening a new TCP connection per request
+_AI_SESSION = requests.Session()
+_AI_SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=Retry(total=3, backoff_factor=0.1)))
+_AI_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=Retry(total=3, backoff_factor=0.1)))
+
+# Async counterpart for calls made from the event loop, so they don't tie up a worker thread
+_AI_ASYNC_CLIENT = httpx.AsyncClient(
+    base_url=AI_SERVER_URL,
+    timeout=60,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    transport=httpx.AsyncHTTPTransport(retries=3)
+)
+
+async def close_ai_client():
+    """Close the async AI client's pooled connections (data server shutdown)."""
+    await _AI_ASYNC_CLIENT.aclose()
+
+AUTH_TOKEN_BUCKET_SECONDS = 300
+
+@functools.lru_cache(maxsize=256)
+def _cached_auth_headers(user: str, bucket: int) -> dict:
+    token = encode_token({"sub": user, "iat": bucket * AUTH_TOKEN_BUCKET_SECONDS})
+    return {"Authorization": f"Bearer {token}"}
 
 def _get_ai_auth_headers(username: str = None):
     """Generate auth headers for AI server requests"""
     # Always create a token - use provided username or 'system' for internal calls
     user = username if username else "system"
-    token = jwt.encode({"sub": user}, SECRET_KEY, algorithm=ALGORITHM)
-    return {"Authorization": f"Bearer {token}"}
+    # Same user within the same 5 minute bucket reuses the already-signed token
+    return dict(_cached_auth_headers(user, int(time.time() // AUTH_TOKEN_BUCKET_SECONDS)))
+
+def _post_json(path: str, payload: dict, username: str = None, **kwargs):
+    """POST an orjson-encoded body to the AI server (orjson also handles datetimes natively)."""
+    headers = _get_ai_auth_headers(username)
+    headers["Content-Type"] = "application/json"
+    return _AI_SESSION.post(f"{AI_SERVER_URL}{path}", data=orjson.dumps(payload), headers=headers, **kwargs)
+
+async def _post_json_async(path: str, payload: dict, username: str = None, **kwargs):
+    """Async _post_json over the shared httpx client."""
+    headers = _get_ai_auth_headers(username)
+    headers["Content-Type"] = "application/json"
+    return await _AI_ASYNC_CLIENT.post(path, content=orjson.dumps(payload), headers=headers, **kwargs)
 
 # def ai_prime_narrator(username: str = None):
 #     headers = _get_ai_auth_headers(username)
@@ -41,59 +89,139 @@ def _get_ai_auth_headers(username: str = None):
 #     except Exception as e:
 #         return len(text) // 4
 
+def _summary_with_cached_count(data: dict) -> str:
+    """
+    Return the summary from a summarize response, caching the token count the AI server
+    computed for it so the caller's ai_calculate_token_count(summary) needs no second request.
+    """
+    summary = data["summary"]
+    token_count = data.get("token_count")
+    if token_count is not None:
+        key = _text_key(summary)
+        _store_token_counts([key], [None], [0], [token_count])
+    return summary
+
 def ai_summarize_chunk(chunk, max_tokens, previous_summary=None, username: str = None):
-    headers = _get_ai_auth_headers(username)
+    """Summarize a chunk (a string or any iterable of entry texts)."""
     payload = {
-        "chunk": chunk,
+        "chunk": chunk if isinstance(chunk, (str, list)) else list(chunk),
         "max_tokens": max_tokens,
         "previous_summary": previous_summary
     }
     
     try:
-        resp = requests.post(f"{AI_SERVER_URL}/summarize_chunk/", json=serialize_for_json(payload), headers=headers)
-        print("[ai_summarize_chunk] Response status:", resp.status_code)
-        print("[ai_summarize_chunk] Response text:", resp.text)
+        # orjson encodes straight to bytes; serialize_for_json would first copy the whole entry list
+        resp = _post_json("/summarize_chunk/", payload, username)
+        logger.debug("[ai_summarize_chunk] Response status: %s", resp.status_code)
         resp.raise_for_status()
-        return resp.json()["summary"]
+        return _summary_with_cached_count(orjson.loads(resp.content))
     except Exception as e:
-        print("[ai_summarize_chunk] Exception:", e)
+        logger.error("[ai_summarize_chunk] Exception: %s", e)
         raise
 
 def ai_deep_summarize_chunk(chunk, max_tokens, previous_summary=None, username: str = None):
-    headers = _get_ai_auth_headers(username)
     payload = {
         "chunk": chunk,
         "max_tokens": max_tokens,
         "previous_summary": previous_summary
     }
-    print("[ai_summarize_chunk] Sending payload:", payload)
     try:
-        resp = requests.post(f"{AI_SERVER_URL}/deep_summarize_chunk/", json=serialize_for_json(payload), headers=headers)
-        print("[ai_deep_summarize_chunk] Response status:", resp.status_code)
-        print("[ai_deep_summarize_chunk] Response text:", resp.text)
+        resp = _post_json("/deep_summarize_chunk/", payload, username)
+        logger.debug("[ai_deep_summarize_chunk] Response status: %s", resp.status_code)
         resp.raise_for_status()
-        return resp.json()["summary"]
+        return _summary_with_cached_count(orjson.loads(resp.content))
     except Exception as e:
-        print("[ai_deep_summarize_chunk] Exception:", e)
+        logger.error("[ai_deep_summarize_chunk] Exception: %s", e)
         raise
 
-def ai_count_tokens_batch(texts: list[str], username: str = None) -> list[int]:
+# Bounded LRU of token counts keyed by a digest of the text, so repeated texts
+# (re-saved entries, unchanged summaries) skip the AI server without unbounded growth
+TOKEN_COUNT_CACHE_MAX = 10000
+_token_count_cache = OrderedDict()
+_token_count_cache_lock = threading.Lock()
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def clear_token_count_cache():
+    """Drop all cached token counts."""
+    with _token_count_cache_lock:
+        _token_count_cache.clear()
+
+def _lookup_token_counts(texts: list[str]):
+    """Return (keys, counts, misses): cached counts filled in, None and listed in misses otherwise."""
+    keys = [_text_key(text) for text in texts]
+    counts = [None] * len(texts)
+    with _token_count_cache_lock:
+        for i, key in enumerate(keys):
+            count = _token_count_cache.get(key)
+            if count is not None:
+                _token_count_cache.move_to_end(key)
+                counts[i] = count
+    return keys, counts, [i for i, count in enumerate(counts) if count is None]
+
+def _store_token_counts(keys, counts, misses, miss_counts):
+    with _token_count_cache_lock:
+        for i, count in zip(misses, miss_counts):
+            counts[i] = count
+            _token_count_cache[keys[i]] = count
+            _token_count_cache.move_to_end(keys[i])
+        while len(_token_count_cache) > TOKEN_COUNT_CACHE_MAX:
+            _token_count_cache.popitem(last=False)
+    return counts
+
+def _estimate_token_counts(texts, counts, misses):
+    # Fallback to rough estimate (not cached)
+    for i in misses:
+        counts[i] = len(texts[i]) // 4
+    return counts
+
+def ai_count_tokens_batch(texts: list[str], username: str = None, estimate: bool = True) -> list[int]:
     """
     Count tokens for multiple texts in a single request.
     Returns a list of token counts in the same order as input texts.
+    Only texts missing from the token count cache are sent to the AI server.
+    With estimate=False a failed request raises instead of returning rough estimates.
     """
+    keys, counts, misses = _lookup_token_counts(texts)
+    if not misses:
+        return counts
+
+    try:
+        response = _post_json(
+            "/tokens/count_tokens_batch/",
+            {"texts": [texts[i] for i in misses]},
+            username,
+            timeout=10
+        )
+        response.raise_for_status()
+        miss_counts = orjson.loads(response.content)["token_counts"]
+    except Exception as e:
+        if not estimate:
+            raise
+        return _estimate_token_counts(texts, counts, misses)
+
+    return _store_token_counts(keys, counts, misses, miss_counts)
+
+async def ai_count_tokens_batch_async(texts: list[str], username: str = None) -> list[int]:
+    """ai_count_tokens_batch for async callers, awaiting the AI server instead of blocking a thread."""
+    keys, counts, misses = _lookup_token_counts(texts)
+    if not misses:
+        return counts
+
     try:
-        response = requests.post(
-            f"{AI_SERVER_URL}/tokens/count_tokens_batch/",
-            json={"texts": texts},
-            headers=_get_ai_auth_headers(username),
+        response = await _post_json_async(
+            "/tokens/count_tokens_batch/",
+            {"texts": [texts[i] for i in misses]},
+            username,
             timeout=10
         )
         response.raise_for_status()
-        return response.json()["token_counts"]
+        miss_counts = orjson.loads(response.content)["token_counts"]
     except Exception as e:
-        # Fallback to rough estimate
-        return [len(text) // 4 for text in texts]
+        return _estimate_token_counts(texts, counts, misses)
+
+    return _store_token_counts(keys, counts, misses, miss_counts)
 
 def ai_calculate_token_count(text: str, username: str = None) -> int:
     """
@@ -105,4 +233,57 @@ def ai_calculate_token_count(text: str, username: str = None) -> int:
     Returns:
         Number of tokens in the text
     """
-    return ai_count_tokens_batch([text], username=username)[0]
\ No newline at end of file
+    return ai_count_tokens_batch([text], username=username)[0]
+
+# Dynamic batching for token counts from async endpoints: concurrent callers are
+# collected for up to TOKEN_BATCH_WINDOW seconds (or TOKEN_BATCH_MAX_SIZE texts)
+# and sent to the AI server as one count_tokens_batch request
+TOKEN_BATCH_MAX_SIZE = 64
+TOKEN_BATCH_WINDOW = 0.005  # seconds
+
+class _TokenCountBatcher:
+    def __init__(self):
+        self._queue = None
+        self._worker = None
+
+    async def count(self, text: str) -> int:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + TOKEN_BATCH_WINDOW
+            while len(batch) < TOKEN_BATCH_MAX_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                counts = await ai_count_tokens_batch_async([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), count in zip(batch, counts):
+                if not future.done():
+                    future.set_result(count)
+
+_token_count_batcher = _TokenCountBatcher()
+
+async def ai_count_tokens_batched(text: str) -> int:
+    """
+    Count tokens for a single text from async code, sharing one AI server request
+    with any other texts submitted at about the same time.
+    """
+    return await _token_count_batcher.count(text)
\ No newline at end of file
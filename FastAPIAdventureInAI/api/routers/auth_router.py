@@ -2,7 +2,7 @@
 Authentication routes.
 Handles user registration and login (JWT token generation).
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -23,5 +23,5 @@ async def register(user: UserRegister, db: Session = Depends(get_db)):
     return await perform_register(user, db)
 
 @router.post("/token", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    return await perform_login(form_data, db)
\ No newline at end of file
+async def login(background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    return await perform_login(background_tasks, form_data, db)
\ No newline at end of file
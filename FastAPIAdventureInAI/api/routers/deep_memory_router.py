@@ -20,19 +20,19 @@ router = APIRouter(prefix="/deep_memory", tags=["deep memory"])
 
 
 @router.post("/")
-async def create_deep_memory(
+def create_deep_memory(
     deep_memory: DeepMemoryCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_create_deep_memory(deep_memory, db, current_user)
+    return perform_create_deep_memory(deep_memory, db, current_user)
 
 
 @router.put("/{deep_memory_id}")
-async def update_deep_memory(
+def update_deep_memory(
     deep_memory_id: int,
     update: DeepMemoryUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_update_deep_memory(deep_memory_id, update, db, current_user)
\ No newline at end of file
+    return perform_update_deep_memory(deep_memory_id, update, db, current_user)
\ No newline at end of file
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/game_ratings", tags=["game ratings"])
 
 
 @router.get("/", response_model=List[GameRatingDTO])
-async def list_game_ratings(db: Session = Depends(get_db)):
+def list_game_ratings(db: Session = Depends(get_db)):
     """
     Get all available game content ratings.
     No authentication required.
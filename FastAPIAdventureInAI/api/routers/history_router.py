@@ -2,11 +2,12 @@
 Story history routes.
 Handles CRUD operations for story history with automatic tokenization and compression.
 """
+from typing import List
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 
-from business.schemas import HistoryEntryIn
+from business.schemas import HistoryEntryIn, HistoryEntryUpdate
 from business.dtos import HistoryDTO
 from business.models import User
 
@@ -15,8 +16,10 @@ from shared.services.auth_service import verify_game_ownership, get_current_user
 
 from api.services.history_service import  (
     perform_create_history_entry,
+    perform_create_history_entries,
     perform_delete_history_entry,
-    perform_update_history_entry
+    perform_update_history_entry,
+    perform_update_history_entries
 )
 
 router = APIRouter(prefix="/history", tags=["history"])
@@ -31,19 +34,37 @@ async def create_history_entry(
 ):
     return await perform_create_history_entry(history_data,saved_game_id, db, current_user)
 
+@router.post("/batch", response_model=List[HistoryDTO], status_code=201)
+async def create_history_entries(
+    entries: List[HistoryEntryIn],
+    saved_game_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await perform_create_history_entries(entries, saved_game_id, db, current_user)
+
 @router.delete("/{history_id}", response_model=dict)
-async def delete_history_entry(
+def delete_history_entry(
     history_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_delete_history_entry(history_id, db, current_user)
+    return perform_delete_history_entry(history_id, db, current_user)
+
+# Declared before /{history_id} so "batch" isn't parsed as an id
+@router.put("/batch", response_model=List[HistoryDTO])
+async def update_history_entries(
+    updates: List[HistoryEntryUpdate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await perform_update_history_entries(updates, db, current_user)
 
 @router.put("/{history_id}", response_model=HistoryDTO)
-async def update_history_entry(
+def update_history_entry(
     history_id: int,
     update_data: dict,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_update_history_entry(history_id, update_data, db, current_user)
\ No newline at end of file
+    return perform_update_history_entry(history_id, update_data, db, current_user)
\ No newline at end of file
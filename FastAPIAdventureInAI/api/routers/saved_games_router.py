@@ -3,7 +3,7 @@ Saved games routes.
 Handles CRUD operations for saved games and related game statistics.
 """
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 
 from business.schemas import SavedGameCreate, SavedGameIdResponse
@@ -26,45 +26,48 @@ router = APIRouter(prefix="/saved_games", tags=["saved games"])
 
 
 @router.get("/{game_id}", response_model=SavedGameDTO)
-async def get_saved_game(
+def get_saved_game(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_get_saved_game(game_id, db, current_user)
+    return perform_get_saved_game(game_id, request, db, current_user)
 
 @router.get("/{game_id}/tokenized_history/", response_model=List[TokenizedHistoryDTO])
-async def list_tokenized_history(
+def list_tokenized_history(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_list_tokenized_history(game_id, db, current_user)
+    return perform_list_tokenized_history(game_id, request, db, current_user)
 
 @router.get("/{game_id}/deep_memory/")
-async def get_deep_memory(
+def get_deep_memory(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_get_deep_memory(game_id, db, current_user)
+    return perform_get_deep_memory(game_id, request, db, current_user)
 
 @router.get("/{game_id}/token_stats")
-async def get_token_stats(
+def get_token_stats(
     game_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_get_token_stats(game_id, db, current_user)
+    return perform_get_token_stats(game_id, db, current_user)
 
 @router.put("/{game_id}", response_model=SavedGameDTO)
-async def update_saved_game(
+def update_saved_game(
     game_id: int,
     game_data: SavedGameCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_update_saved_game(game_id, game_data, db, current_user)
+    return perform_update_saved_game(game_id, game_data, db, current_user)
 
 @router.post("/", response_model=SavedGameIdResponse, status_code=201)
 async def create_saved_game(
@@ -75,9 +78,9 @@ async def create_saved_game(
     return await perform_create_saved_game(game_data, db, current_user)
 
 @router.delete("/{game_id}", response_model=dict)
-async def delete_saved_game(
+def delete_saved_game(
     game_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_delete_saved_game(game_id, db, current_user)
+    return perform_delete_saved_game(game_id, db, current_user)
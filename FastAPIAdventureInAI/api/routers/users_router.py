@@ -25,40 +25,40 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 # Protected endpoint to get current user's AccountLevel and AIDirectiveSettings
 @router.get("/account_level/me", response_model=AccountLevelDTO)
-async def get_account_level_me(
+def get_account_level_me(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_get_account_level_me(db, current_user)
+    return perform_get_account_level_me(db, current_user)
 
 @router.post("/", response_model=UserDTO)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    return await perform_create_user(user, db)
+def create_user(user: UserCreate, db: Session = Depends(get_db)):
+    return perform_create_user(user, db)
 
 
 @router.get("/{user_id}", response_model=UserDTO)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
-    return  await perform_get_user(user_id, db)
+def get_user(user_id: int, db: Session = Depends(get_db)):
+    return perform_get_user(user_id, db)
 
 @router.get("/by_username/{username}", response_model=UserDTO)
-async def get_user_by_username_endpoint(
+def get_user_by_username_endpoint(
     username: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_get_user_by_username_endpoint(username, db, current_user)
+    return perform_get_user_by_username_endpoint(username, db, current_user)
 
 @router.get("/me/worlds/", response_model=List[WorldDTO])
-async def list_my_worlds(
+def list_my_worlds(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_list_my_worlds(db, current_user)
+    return perform_list_my_worlds(db, current_user)
 
 @router.get("/{user_id}/saved_games/", response_model=List[SavedGameDTO])
-async def list_user_saved_games(
+def list_user_saved_games(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await perform_list_user_saved_games(user_id, db, current_user)
\ No newline at end of file
+    return perform_list_user_saved_games(user_id, db, current_user)
\ No newline at end of file
@@ -2,12 +2,13 @@
 Authentication routes.
 Handles user registration and login (JWT token generation).
 """
+import asyncio
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException
+from fastapi import BackgroundTasks, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from shared.services.orm_service import get_db
+from shared.services.orm_service import get_db, SessionLocal, no_expire_on_commit
 from shared.services.auth_service import authenticate_user, create_access_token, get_password_hash, get_user_by_username
 from business.schemas import UserRegister, Token
 from business.dtos import UserDTO
@@ -21,43 +22,57 @@ async def perform_register(user: UserRegister, db: Session = Depends(get_db)):
     Creates a new user with hashed password.
     Returns 400 if username already exists.
     """
-    if get_user_by_username(db, user.username):
+    if await asyncio.to_thread(get_user_by_username, db, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    hashed_password = get_password_hash(user.password)
+    # Hash off the event loop; Argon2 is CPU-bound
+    hashed_password = await asyncio.to_thread(get_password_hash, user.password)
     db_user = User(username=user.username, email=user.email, password_hash=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    
+    def _insert_user():
+        db.add(db_user)
+        # The INSERT returns the generated columns; keep them across the commit instead of refreshing
+        with no_expire_on_commit(db):
+            db.commit()
+    
+    # The blocking INSERT/commit runs in a worker thread so the event loop keeps serving requests
+    await asyncio.to_thread(_insert_user)
     return db_user
 
-async def perform_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def _persist_session(user_id: int, access_token: str):
+    """Persist the session token in the database with an expiry timestamp (runs after the response is sent)."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db_session = SessionModel(
+            user_id=user_id,
+            token=access_token,
+            expires_at=now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+            last_activity=now
+        )
+        db.add(db_session)
+        db.commit()
+    except Exception:
+        # If DB write fails, do not block authentication; just log/continue
+        # (Logging not configured here; swallow exception to avoid breaking login)
+        db.rollback()
+    finally:
+        db.close()
+
+async def perform_login(background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Login endpoint - authenticate user and return JWT access token.
     
     Uses OAuth2 password flow (form data with username and password).
     Returns access token that must be included in subsequent requests.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     access_token = create_access_token(data={"sub": user.username})
 
-    # Persist the session token in the database with an expiry timestamp
-    try:
-        expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        db_session = SessionModel(
-            user_id=user.id,
-            token=access_token,
-            expires_at=expires_at,
-            last_activity=datetime.utcnow()
-        )
-        db.add(db_session)
-        db.commit()
-    except Exception:
-        # If DB write fails, do not block authentication; just log/continue
-        # (Logging not configured here; swallow exception to avoid breaking login)
-        pass
+    # Record the session off the critical path; the token is valid without it
+    background_tasks.add_task(_persist_session, user.id, access_token)
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -2,7 +2,6 @@
 Deep memory routes.
 Handles ultra-compressed long-term story memory for saved games.
 """
-from datetime import datetime
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
 
@@ -10,10 +9,10 @@ from sqlalchemy.orm import Session
 from business.schemas import DeepMemoryCreate, DeepMemoryUpdate
 from business.models import User, DeepMemory
 from api.services.memory_service import ai_calculate_token_count
-from shared.services.orm_service import get_db
-from shared.services.auth_service import verify_game_ownership, get_current_user
+from shared.services.orm_service import get_db, touch_saved_game
+from shared.services.auth_service import verify_game_ownership, get_owned_game_row, get_current_user
 
-async def perform_create_deep_memory(
+def perform_create_deep_memory(
     deep_memory: DeepMemoryCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -24,9 +23,9 @@ async def perform_create_deep_memory(
     """
     verify_game_ownership(deep_memory.saved_game_id, current_user.id, db)
 
-    # Only allow one DeepMemory per saved_game_id
-    existing = db.query(DeepMemory).filter(DeepMemory.saved_game_id == deep_memory.saved_game_id).first()
-    if existing:
+    # Only allow one DeepMemory per saved_game_id (EXISTS, so the summary text isn't read;
+    # saved_game_id is also unique in the schema)
+    if db.query(db.query(DeepMemory.id).filter(DeepMemory.saved_game_id == deep_memory.saved_game_id).exists()).scalar():
         raise HTTPException(status_code=400, detail="Deep memory already exists for this saved game")
 
     token_count = ai_calculate_token_count(deep_memory.summary)
@@ -35,13 +34,13 @@ async def perform_create_deep_memory(
         summary=deep_memory.summary,
         token_count=token_count,
         chunks_merged=0,
-        last_merged_end_index=0,
-        updated_at=datetime.utcnow()
+        last_merged_end_index=0
     )
     db.add(new_deep_memory)
-    db.commit()
-    db.refresh(new_deep_memory)
-    return {
+    touch_saved_game(deep_memory.saved_game_id, db)
+    # Flush fills in id/updated_at; build the response before commit instead of refreshing after it
+    db.flush()
+    result = {
         "id": new_deep_memory.id,
         "summary": new_deep_memory.summary,
         "token_count": new_deep_memory.token_count,
@@ -49,8 +48,10 @@ async def perform_create_deep_memory(
         "last_merged_end_index": new_deep_memory.last_merged_end_index,
         "updated_at": new_deep_memory.updated_at
     }
+    db.commit()
+    return result
 
-async def perform_update_deep_memory(
+def perform_update_deep_memory(
     deep_memory_id: int,
     update: DeepMemoryUpdate,
     db: Session = Depends(get_db),
@@ -60,26 +61,18 @@ async def perform_update_deep_memory(
     Update the deep memory summary (for manual editing).
     Automatically recalculates token count.
     """
-    deep_memory = db.query(DeepMemory).filter(DeepMemory.id == deep_memory_id).first()
-    if not deep_memory:
-        raise HTTPException(status_code=404, detail="Deep memory not found")
-
-    # Verify ownership via saved_game
-    verify_game_ownership(deep_memory.saved_game_id, current_user.id, db)
+    # Load and verify ownership via saved_game in one query
+    deep_memory = get_owned_game_row(DeepMemory, deep_memory_id, current_user.id, db, "Deep memory not found")
 
     # Update summary
     deep_memory.summary = update.summary
 
-    # Recalculate token count
+    # Recalculate token count (updated_at is set by the database on update)
     deep_memory.token_count = ai_calculate_token_count(update.summary)
 
-    # Update timestamp
-    deep_memory.updated_at = datetime.utcnow()
-
-    db.commit()
-    db.refresh(deep_memory)
-
-    return {
+    touch_saved_game(deep_memory.saved_game_id, db)
+    db.flush()
+    result = {
         "id": deep_memory.id,
         "summary": deep_memory.summary,
         "token_count": deep_memory.token_count,
@@ -87,3 +80,5 @@ async def perform_update_deep_memory(
         "last_merged_end_index": deep_memory.last_merged_end_index,
         "updated_at": deep_memory.updated_at
     }
+    db.commit()
+    return result
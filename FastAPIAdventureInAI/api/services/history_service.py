@@ -2,19 +2,22 @@
 Story history routes.
 Handles CRUD operations for story history with automatic tokenization and compression.
 """
+import asyncio
 from datetime import datetime, timezone
+from typing import List
 from fastapi import Depends, HTTPException
-from sqlalchemy import func
+from sqlalchemy import func, delete, update
 from sqlalchemy.orm import Session
 
 
-from business.schemas import HistoryEntryIn
+from business.schemas import HistoryEntryIn, HistoryEntryUpdate
 from business.dtos import HistoryDTO
-from business.models import User, StoryHistory, TokenizedHistory, DeepMemory
+from business.models import User, SavedGame, StoryHistory, TokenizedHistory, DeepMemory, tokenized_history_refs
 from business.converters import history_to_dto
-from shared.helpers.ai_settings import get_setting, get_memory_limits
-from shared.services.orm_service import get_db
-from shared.services.auth_service import verify_game_ownership, get_current_user
+from shared.helpers.ai_settings import get_setting, get_settings_bulk, get_memory_limits
+from shared.services.orm_service import get_db, no_expire_on_commit, touch_saved_game, claim_saved_game, release_saved_game
+from shared.services.auth_service import verify_game_ownership, get_owned_game_row, get_current_user
+from api.ai_client_requests import ai_count_tokens_batch_async
 from api.services.memory_service import (
     update_text_with_token_count,
     summarize_history_chunk,
@@ -37,84 +40,176 @@ async def perform_create_history_entry(
     max_entry_index = db.query(func.max(StoryHistory.entry_index)).filter(
         StoryHistory.saved_game_id == saved_game_id
     ).scalar()
-    next_entry_index = (max_entry_index or -1) + 1
+    next_entry_index = (-1 if max_entry_index is None else max_entry_index) + 1
     
     new_history = StoryHistory(
         saved_game_id=saved_game_id,
         entry_index=next_entry_index,
-        text=history_data.entry,
-        created_at=datetime.now(timezone.utc)
+        text=history_data.entry
     )
     db.add(new_history)
+    # Update game timestamp in the same commit (the entry's created_at is filled in by the database)
+    game.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(new_history)
     
-    # Update game timestamp
+    # Check if tokenization is needed; the AI round trips block, so run them off the
+    # event loop and let compressions for other games proceed concurrently
+    await asyncio.to_thread(check_and_tokenize_history, saved_game_id, db, username=current_user.username)
+    
+    return history_to_dto(new_history)
+
+# Largest number of entries one batch append accepts
+MAX_HISTORY_BATCH_SIZE = 100
+
+async def perform_create_history_entries(
+    entries: List[HistoryEntryIn],
+    saved_game_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Append several history entries in one request (one token count round trip, one INSERT
+    batch, one commit), then run the tokenization check once for all of them.
+    """
+    if len(entries) > MAX_HISTORY_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HISTORY_BATCH_SIZE} history entries per request")
+    game = verify_game_ownership(saved_game_id, current_user.id, db)
+    if not entries:
+        return []
+    
+    # Counted before any rows are written, so the AI call doesn't hold the transaction open
+    token_counts = await ai_count_tokens_batch_async([entry.entry for entry in entries])
+    
+    max_entry_index = db.query(func.max(StoryHistory.entry_index)).filter(
+        StoryHistory.saved_game_id == saved_game_id
+    ).scalar()
+    first_entry_index = (-1 if max_entry_index is None else max_entry_index) + 1
+    
+    new_entries = [
+        StoryHistory(
+            saved_game_id=saved_game_id,
+            entry_index=first_entry_index + offset,
+            text=entry.entry,
+            token_count=token_count
+        )
+        for offset, (entry, token_count) in enumerate(zip(entries, token_counts))
+    ]
+    db.add_all(new_entries)
     game.updated_at = datetime.now(timezone.utc)
+    db.flush()
+    new_ids = [entry.id for entry in new_entries]
     db.commit()
     
-    # Check if tokenization is needed
-    check_and_tokenize_history(saved_game_id, db, username=current_user.username)
+    await asyncio.to_thread(check_and_tokenize_history, saved_game_id, db, username=current_user.username)
     
-    return history_to_dto(new_history)
+    # Re-read after tokenization (one SELECT) so is_tokenized reflects any compression
+    created = db.query(StoryHistory).filter(StoryHistory.id.in_(new_ids)).order_by(StoryHistory.entry_index).populate_existing().all()
+    return [history_to_dto(entry) for entry in created]
 
-async def perform_delete_history_entry(
+def perform_delete_history_entry(
     history_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a history entry and clean up tokenized chunk references."""
-    history_entry = db.query(StoryHistory).filter(StoryHistory.id == history_id).first()
-    if not history_entry:
-        raise HTTPException(status_code=404, detail="History entry not found")
-    
-    verify_game_ownership(history_entry.saved_game_id, current_user.id, db)
-    
-    # Check for tokenized chunks that reference this history entry
-    tokenized_chunks = db.query(TokenizedHistory).filter(
-        TokenizedHistory.saved_game_id == history_entry.saved_game_id
-    ).all()
-    
-    for chunk in tokenized_chunks:
-        if chunk.history_references:
-            ref_ids = [int(id.strip()) for id in chunk.history_references.split(',')]
-            if history_id in ref_ids:
-                # Remove this ID from references
-                ref_ids.remove(history_id)
-                
-                if not ref_ids:
-                    # No more references - delete the tokenized chunk
-                    db.delete(chunk)
-                else:
-                    # Update the references list
-                    chunk.history_references = ','.join(str(id) for id in ref_ids)
-    
-    db.delete(history_entry)
+    history_entry = get_owned_game_row(StoryHistory, history_id, current_user.id, db, "History entry not found")
+    
+    # Find the tokenized chunks that reference this history entry (indexed lookup, no CSV parsing)
+    chunk_ids = [chunk_id for (chunk_id,) in db.query(tokenized_history_refs.c.tokenized_history_id).filter(
+        tokenized_history_refs.c.story_history_id == history_id
+    )]
+    db.execute(delete(tokenized_history_refs).where(tokenized_history_refs.c.story_history_id == history_id))
+    
+    if chunk_ids:
+        # Rebuild the references of the affected chunks from what is left
+        remaining_refs = {chunk_id: [] for chunk_id in chunk_ids}
+        for chunk_id, story_history_id in db.query(
+            tokenized_history_refs.c.tokenized_history_id,
+            tokenized_history_refs.c.story_history_id
+        ).filter(
+            tokenized_history_refs.c.tokenized_history_id.in_(chunk_ids)
+        ).order_by(tokenized_history_refs.c.story_history_id):
+            remaining_refs[chunk_id].append(str(story_history_id))
+        
+        # No more references - delete the tokenized chunk
+        empty_chunk_ids = [chunk_id for chunk_id, refs in remaining_refs.items() if not refs]
+        if empty_chunk_ids:
+            db.execute(delete(TokenizedHistory).where(TokenizedHistory.id.in_(empty_chunk_ids)))
+        # Otherwise update the references list
+        updated_chunks = [
+            {"id": chunk_id, "history_references": ','.join(refs)}
+            for chunk_id, refs in remaining_refs.items() if refs
+        ]
+        if updated_chunks:
+            db.execute(update(TokenizedHistory), updated_chunks)
+    
+    db.execute(delete(StoryHistory).where(StoryHistory.id == history_id))
+    touch_saved_game(history_entry.saved_game_id, db)
     db.commit()
     return {"detail": "History entry deleted"}
 
-async def perform_update_history_entry(
+def perform_update_history_entry(
     history_id: int,
     update_data: dict,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update a history entry's text and recalculate token count."""
-    history_entry = db.query(StoryHistory).filter(StoryHistory.id == history_id).first()
-    if not history_entry:
-        raise HTTPException(status_code=404, detail="History entry not found")
-    
-    verify_game_ownership(history_entry.saved_game_id, current_user.id, db)
+    history_entry = get_owned_game_row(StoryHistory, history_id, current_user.id, db, "History entry not found")
     
-    # Update the text field (model uses 'text', not 'entry')
-    if "text" in update_data:
+    # Update the text field (model uses 'text', not 'entry'); unchanged text keeps its token count
+    if "text" in update_data and (update_data["text"] != history_entry.text or history_entry.token_count is None):
         history_entry.text = update_data["text"]
         # Recalculate token count for the modified entry
         update_text_with_token_count(history_entry.text, history_entry)
     
+    touch_saved_game(history_entry.saved_game_id, db)
+    db.flush()
+    result = HistoryDTO.model_validate(history_entry)
     db.commit()
-    db.refresh(history_entry)
-    return HistoryDTO.model_validate(history_entry)
+    return result
+
+async def perform_update_history_entries(
+    updates: List[HistoryEntryUpdate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update the text of several history entries, counting all their tokens in one AI server request."""
+    if not updates:
+        return []
+    
+    # Owner comes back with each entry, so no per-game verify_game_ownership lookup follows
+    rows = db.query(StoryHistory, SavedGame.user_id).join(
+        SavedGame, SavedGame.id == StoryHistory.saved_game_id
+    ).filter(StoryHistory.id.in_({item.id for item in updates})).all()
+    entries = {entry.id: entry for entry, _ in rows}
+    missing_ids = [item.id for item in updates if item.id not in entries]
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"History entries not found: {missing_ids}")
+    if any(owner_id != current_user.id for _, owner_id in rows):
+        raise HTTPException(status_code=403, detail="Forbidden: not your saved game")
+    
+    # Entries whose text is unchanged keep their token count
+    changed_entries = []
+    for item in updates:
+        entry = entries[item.id]
+        if item.text != entry.text or entry.token_count is None:
+            entry.text = item.text
+            changed_entries.append(entry)
+    
+    # One count_tokens_batch round trip for every changed text instead of one per entry
+    if changed_entries:
+        token_counts = await ai_count_tokens_batch_async([entry.text for entry in changed_entries])
+        for entry, token_count in zip(changed_entries, token_counts):
+            entry.token_count = token_count
+    
+    # Build the response before commit expires the entries
+    result = [history_to_dto(entries[item.id]) for item in updates]
+    for saved_game_id in {entry.saved_game_id for entry in changed_entries}:
+        touch_saved_game(saved_game_id, db)
+    db.commit()
+    return result
 
 
 
@@ -137,23 +232,34 @@ def check_and_tokenize_history(saved_game_id: int, db: Session, username: str =
     - Mark history entries as tokenized and track references
     - Refine the most recent tokenized chunk when new tokens are added to it
     """
+    # Loaded entries and chunks stay populated across the commits made while compressing
+    with no_expire_on_commit(db):
+        # Another worker is already compressing this game; it picks up these entries on the next write
+        if not claim_saved_game(saved_game_id, db):
+            return
+        try:
+            _check_and_tokenize_history(saved_game_id, db, username)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            release_saved_game(saved_game_id, db)
+
+def _check_and_tokenize_history(saved_game_id: int, db: Session, username: str = None):
     limits = get_memory_limits(db)
-    TOKENIZE_THRESHOLD = get_setting('TOKENIZE_THRESHOLD', db)  # 800 tokens triggers compression
-    TOKENIZED_HISTORY_BLOCK_SIZE = get_setting('TOKENIZED_HISTORY_BLOCK_SIZE', db)  # 200 tokens per chunk
-    
-    # Get all history entries ordered by index
-    all_history = db.query(StoryHistory).filter(
-        StoryHistory.saved_game_id == saved_game_id
-    ).order_by(StoryHistory.entry_index).all()
-    
-    if not all_history:
-        return
+    # 800 tokens triggers compression, 200 tokens per chunk
+    TOKENIZE_THRESHOLD, TOKENIZED_HISTORY_BLOCK_SIZE = get_settings_bulk(
+        ('TOKENIZE_THRESHOLD', 'TOKENIZED_HISTORY_BLOCK_SIZE'), db
+    )
     
     # Calculate token counts for entries that don't have them
     ensure_history_token_counts(saved_game_id, db)
     
-    # Get untokenized entries
-    untokenized = [h for h in all_history if not h.is_tokenized]
+    # Only the untokenized tail is needed; loading the whole history made memory grow with game length
+    untokenized = db.query(StoryHistory).filter(
+        StoryHistory.saved_game_id == saved_game_id,
+        StoryHistory.is_tokenized == 0
+    ).order_by(StoryHistory.entry_index).all()
     
     if not untokenized:
         return
@@ -178,7 +284,6 @@ def check_and_tokenize_history(saved_game_id: int, db: Session, username: str =
 
 def save_tokenized_history_compression_response(should_merge, latest_tokenized, chunk_entries, new_summary, new_summary_token_count, utilization, saved_game_id: int, db: Session, username: str = None):
     TOKENIZED_HISTORY_BLOCK_SIZE = get_setting('TOKENIZED_HISTORY_BLOCK_SIZE', db)  # 200 tokens per chunk
-    # Create history references string
     if should_merge and latest_tokenized:
         # When merging, combine old summary with new summary
         if latest_tokenized.summary:
@@ -196,32 +301,28 @@ def save_tokenized_history_compression_response(should_merge, latest_tokenized,
             print(f"Combined summary would be {combined_token_count} tokens (limit: {TOKENIZED_HISTORY_BLOCK_SIZE}), creating new chunk instead")
             summary = new_summary
             summary_token_count = new_summary_token_count
-            history_references = ','.join([str(e.id) for e in chunk_entries])
         else:
             # Combined summary fits - use it for the merge
             summary = combined_summary
             summary_token_count = combined_token_count
-            
-            # Include both old and new entry IDs
-            if latest_tokenized.history_references:
-                old_ids = latest_tokenized.history_references.split(',')
-                new_ids = [str(e.id) for e in chunk_entries]
-                all_ids = old_ids + new_ids
-                history_references = ','.join(all_ids)
-            else:
-                history_references = ','.join([str(e.id) for e in chunk_entries])
     else:
         # Not merging - use new summary as-is
         summary = new_summary
         summary_token_count = new_summary_token_count
-        history_references = ','.join([str(e.id) for e in chunk_entries])
+    
+    # References live in the tokenized_history_refs table; the CSV column is only appended to, never parsed
+    new_references = ','.join([str(e.id) for e in chunk_entries])
     
     if should_merge and latest_tokenized:
         # Update existing chunk with merged content
         latest_tokenized.summary = summary
         latest_tokenized.token_count = summary_token_count
         latest_tokenized.end_index = chunk_entries[-1].entry_index
-        latest_tokenized.history_references = history_references
+        latest_tokenized.entries.extend(chunk_entries)
+        if latest_tokenized.history_references:
+            latest_tokenized.history_references = f"{latest_tokenized.history_references},{new_references}"
+        else:
+            latest_tokenized.history_references = new_references
         print(f"Updated tokenized chunk (was {utilization*100:.1f}% full, merged new entries)")
     else:
         # Create new tokenized chunk
@@ -231,17 +332,19 @@ def save_tokenized_history_compression_response(should_merge, latest_tokenized,
             end_index=chunk_entries[-1].entry_index,
             summary=summary,
             token_count=summary_token_count,
-            history_references=history_references,
-            created_at=datetime.now(timezone.utc)
+            history_references=new_references,
+            entries=list(chunk_entries)
         )
 
         db.add(new_tokenized)
         print(f"Created new tokenized chunk with {len(chunk_entries)} entries ({summary_token_count} tokens)")
     
-    # Mark all chunk entries as tokenized
-    for entry in chunk_entries:
-        entry.is_tokenized = 1
+    # Mark all chunk entries as tokenized (one UPDATE; 'evaluate' keeps the loaded objects in sync)
+    db.query(StoryHistory).filter(
+        StoryHistory.id.in_([e.id for e in chunk_entries])
+    ).update({StoryHistory.is_tokenized: 1}, synchronize_session="evaluate")
 
+    touch_saved_game(saved_game_id, db)
     db.commit()
     
     # Check if we need to compress into deep memory
@@ -252,7 +355,10 @@ def save_tokenized_history_compression_response(should_merge, latest_tokenized,
 
 
 def send_tokenize_history_compression_request(saved_game_id: int, db: Session, username: str = None, untokenized = None):
-    TOKENIZED_HISTORY_BLOCK_SIZE = get_setting('TOKENIZED_HISTORY_BLOCK_SIZE', db)  # 200 tokens per chunk
+    # 200 tokens per chunk, merge while under 75% of block size
+    TOKENIZED_HISTORY_BLOCK_SIZE, TOKENIZED_HISTORY_MERGE_LIMIT = get_settings_bulk(
+        ('TOKENIZED_HISTORY_BLOCK_SIZE', 'TOKENIZED_HISTORY_MERGE_LIMIT'), db
+    )
 
     # Get the most recent tokenized chunk for this game
     latest_tokenized = db.query(TokenizedHistory).filter(
@@ -262,7 +368,8 @@ def send_tokenize_history_compression_request(saved_game_id: int, db: Session, u
     if untokenized is None:
         # Get untokenized entries
         untokenized = db.query(StoryHistory).filter(
-            StoryHistory.saved_game_id == saved_game_id and StoryHistory.is_tokenized == 0
+            StoryHistory.saved_game_id == saved_game_id,
+            StoryHistory.is_tokenized == 0
         ).order_by(StoryHistory.entry_index).all()
 
     # Check if we should merge with the latest chunk (if it's less than 90% full)
@@ -271,9 +378,9 @@ def send_tokenize_history_compression_request(saved_game_id: int, db: Session, u
     
     utilization = 0
     if latest_tokenized and latest_tokenized.token_count:
-        # Calculate if the latest chunk is less than 90% of target size
+        # Merge while the latest chunk is under 75% of target size (precomputed integer limit)
         utilization = latest_tokenized.token_count / TOKENIZED_HISTORY_BLOCK_SIZE
-        if utilization < .75:
+        if latest_tokenized.token_count < TOKENIZED_HISTORY_MERGE_LIMIT:
             should_merge = True
             # We'll use the existing summary as context, not re-summarize the old entries
     
@@ -287,9 +394,8 @@ def send_tokenize_history_compression_request(saved_game_id: int, db: Session, u
         # When creating new chunk, use the latest existing chunk as context
         previous_summary = latest_tokenized.summary
     
-    chunk_text = [e.text for e in chunk_entries]
     new_summary, new_summary_token_count = summarize_history_chunk(
-        chunk_text,
+        (e.text for e in chunk_entries),
         TOKENIZED_HISTORY_BLOCK_SIZE,
         previous_summary=previous_summary,
         username=username
@@ -303,15 +409,22 @@ def compress_old_chunks_to_deep_memory(saved_game_id: int, db: Session, username
     When tokenized chunks exceed MAX_TOKENIZED_HISTORY_BLOCK, merge oldest chunks into deep memory.
     This keeps the tokenized history manageable while preserving ancient story context.
     """
-    MAX_TOKENIZED_HISTORY_BLOCK = get_setting('MAX_TOKENIZED_HISTORY_BLOCK', db)
-    TOKENIZE_THRESHOLD = get_setting('TOKENIZE_THRESHOLD', db)
-    TOKENIZED_HISTORY_BLOCK_SIZE =  get_setting('TOKENIZED_HISTORY_BLOCK_SIZE', db)
+    # Loaded chunks stay populated across the deep memory commit
+    with no_expire_on_commit(db):
+        _compress_old_chunks_to_deep_memory(saved_game_id, db, username)
+
+def _compress_old_chunks_to_deep_memory(saved_game_id: int, db: Session, username: str = None):
+    MAX_TOKENIZED_HISTORY_BLOCK, TOKENIZE_THRESHOLD, TOKENIZED_HISTORY_BLOCK_SIZE, DEEP_MEMORY_MAX_TOKENS = get_settings_bulk(
+        ('MAX_TOKENIZED_HISTORY_BLOCK', 'TOKENIZE_THRESHOLD', 'TOKENIZED_HISTORY_BLOCK_SIZE', 'DEEP_MEMORY_MAX_TOKENS'), db
+    )
     
-    # Count current ACTIVE tokenized chunks (not yet compressed into deep memory)
-    chunk_count = db.query(TokenizedHistory).filter(
+    # Load current ACTIVE tokenized chunks (not yet compressed into deep memory) oldest first;
+    # every active chunk is compressed, so one query serves both the count gate and the merge
+    old_chunks = db.query(TokenizedHistory).filter(
         TokenizedHistory.saved_game_id == saved_game_id,
         TokenizedHistory.is_tokenized == 0
-    ).count()
+    ).order_by(TokenizedHistory.end_index.asc()).all()
+    chunk_count = len(old_chunks)
     
     print(f"{chunk_count} of {MAX_TOKENIZED_HISTORY_BLOCK} tokenized chunks for saved_game_id {saved_game_id}")
     if chunk_count <= MAX_TOKENIZED_HISTORY_BLOCK:
@@ -320,16 +433,6 @@ def compress_old_chunks_to_deep_memory(saved_game_id: int, db: Session, username
     # How many chunks to merge into deep memory
     chunks_to_compress = chunk_count# - MAX_TOKENIZED_HISTORY_BLOCK + 2  # Compress extras + 2 more
     
-    # Get oldest ACTIVE chunks to compress
-    old_chunks = db.query(TokenizedHistory).filter(
-        TokenizedHistory.saved_game_id == saved_game_id,
-        TokenizedHistory.is_tokenized == 0
-    ).order_by(TokenizedHistory.end_index.asc()).limit(chunks_to_compress).all()
-    
-    if not old_chunks:
-        print("No old chunks found for deep memory compression.")
-        return
-    
     print(f"\n{'='*80}")
     print(f"DEEP MEMORY COMPRESSION: {len(old_chunks)} chunks exceed limit")
     print(f"{'='*80}")
@@ -339,7 +442,9 @@ def compress_old_chunks_to_deep_memory(saved_game_id: int, db: Session, username
     print(f"{'='*80}\n")
     
     # ASYNC MEMORY QUEUE SERVICE - BY HERE WE KNOW THAT WE NEED TO COMPRESS TO DEEP MEMORY  AT THIS POINT WE WOULD CALL THE ASYNC QUEUE SERVICE this would be call to have the below code segment called by the queue
-    deep_summary, deep_token_count, deep_memory = send_deep_memory_compression_request(saved_game_id, db, old_chunks, username=username)
+    deep_summary, deep_token_count, deep_memory = send_deep_memory_compression_request(
+        saved_game_id, db, old_chunks, username=username, deep_memory_max_tokens=DEEP_MEMORY_MAX_TOKENS
+    )
 
     # ASYNC MEMORY QUEUE SERVICE - BY HERE WHERE KNOW THAT THE QUEUE HAS SUCCEEDED AND WE NEED TO SAVE this section calls after the queue confirms success
     save_deep_memmory_compression_response(deep_memory, old_chunks, deep_summary, deep_token_count, saved_game_id, db, username=username)
@@ -365,7 +470,6 @@ def save_deep_memmory_compression_response(deep_memory, old_chunks, deep_summary
         deep_memory.token_count = deep_token_count
         deep_memory.chunks_merged += len(old_chunks)
         deep_memory.last_merged_end_index = old_chunks[-1].end_index
-        deep_memory.updated_at = datetime.now(timezone.utc)
         print(f"Updated deep memory: {deep_memory.chunks_merged} total chunks compressed")
     else:
         # Create new deep memory
@@ -374,21 +478,22 @@ def save_deep_memmory_compression_response(deep_memory, old_chunks, deep_summary
             summary=deep_summary,
             token_count=deep_token_count,
             chunks_merged=len(old_chunks),
-            last_merged_end_index=old_chunks[-1].end_index,
-            created_at=datetime.now(timezone.utc)
+            last_merged_end_index=old_chunks[-1].end_index
         )
         db.add(deep_memory)
         print(f"Created deep memory: {len(old_chunks)} chunks compressed")
     
-    # Mark the compressed tokenized chunks as tokenized (compressed into deep memory)
-    for chunk in old_chunks:
-        chunk.is_tokenized = 1
+    # Mark the compressed tokenized chunks as tokenized (compressed into deep memory) in one UPDATE
+    db.query(TokenizedHistory).filter(
+        TokenizedHistory.id.in_([chunk.id for chunk in old_chunks])
+    ).update({TokenizedHistory.is_tokenized: 1}, synchronize_session="evaluate")
     
+    touch_saved_game(saved_game_id, db)
     db.commit()
 
 
-def send_deep_memory_compression_request(saved_game_id: int, db: Session, old_chunks, username: str = None):
-    DEEP_MEMORY_MAX_TOKENS = get_setting('DEEP_MEMORY_MAX_TOKENS', db)
+def send_deep_memory_compression_request(saved_game_id: int, db: Session, old_chunks, username: str = None, deep_memory_max_tokens: int = None):
+    DEEP_MEMORY_MAX_TOKENS = deep_memory_max_tokens if deep_memory_max_tokens is not None else get_setting('DEEP_MEMORY_MAX_TOKENS', db)
 
     # Get or create deep memory for this game
     deep_memory = db.query(DeepMemory).filter(
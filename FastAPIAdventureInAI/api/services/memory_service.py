@@ -2,9 +2,10 @@
 Memory management service for story history compression and token counting.
 Centralizes token counting, text summarization, and memory compression logic.
 """
-from typing import List, Optional
+from typing import Iterable, List, Optional
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
-import requests
+from sqlalchemy.orm.attributes import set_committed_value
 import jwt
 
 from fastapi import HTTPException
@@ -12,8 +13,9 @@ from config import SECRET_KEY, ALGORITHM, AI_SERVER_URL
 from business.models import StoryHistory, TokenizedHistory, DeepMemory, SavedGame
 from api.ai_client_requests import ai_count_tokens_batch, ai_calculate_token_count, ai_summarize_chunk, ai_deep_summarize_chunk
 from shared.helpers.memory_helper import get_recent_memories
-from shared.helpers.ai_settings import get_setting
+from shared.helpers.ai_settings import get_settings_bulk
 from shared.services.auth_service import _get_auth_headers
+from shared.services.orm_service import touch_saved_game
 
 # def get_recent_memories(memory_log, limit=None):
 #     """
@@ -41,7 +43,7 @@ def update_text_with_token_count(text: str, db_object, text_field: str = "text")
     return token_count
 
 def summarize_history_chunk(
-    history_texts: List[str],
+    history_texts: Iterable[str],
     max_tokens: int,
     previous_summary: Optional[str] = None,
     username: Optional[str] = None
@@ -50,7 +52,7 @@ def summarize_history_chunk(
     Summarize a chunk of history entries using AI.
     
     Args:
-        history_texts: List of history entry texts to summarize
+        history_texts: History entry texts to summarize (list or generator)
         max_tokens: Maximum tokens for the summary
         previous_summary: Previous chunk's summary for context
         username: Username for AI request tracking
@@ -74,6 +76,20 @@ def summarize_history_chunk(
     token_count = ai_calculate_token_count(summary)
     return summary, token_count
 
+# Static instructions for deep memory compression, built once at import
+_DEEP_COMPRESS_PREAMBLE = (
+    "Compress these story summaries into a single ultra-concise deep memory.\n"
+    "Extract ONLY the most critical information:\n"
+    "  - Major plot arcs and their resolutions\n"
+    "  - Significant character introductions and relationship shifts\n"
+    "  - World-changing events or discoveries\n"
+    "  - Ongoing missions or tasks\n"
+    "Remove ALL minor details, scene descriptions, and redundant information.\n"
+    "Retain chronological order.\n"
+    "# Summaries to Compress:\n\n"
+)
+_DEEP_COMPRESS_SEPARATOR = "\n\n---\n\n"
+
 def compress_to_deep_memory(
     summaries: List[str],
     max_tokens: int,
@@ -90,26 +106,8 @@ def compress_to_deep_memory(
     Returns:
         Tuple of (deep_summary, token_count)
     """    
-    prompt = (
-        "Compress these story summaries into a single ultra-concise deep memory.\n"
-        "Extract ONLY the most critical information:\n"
-        "  - Major plot arcs and their resolutions\n"
-        "  - Significant character introductions and relationship shifts\n"
-        "  - World-changing events or discoveries\n"
-        "  - Ongoing missions or tasks\n"
-        "Remove ALL minor details, scene descriptions, and redundant information.\n"
-        "Retain chronological order.\n"
-        "# Summaries to Compress:\n\n"
-        + "\n\n---\n\n".join(summaries)
-    )
+    prompt = _DEEP_COMPRESS_PREAMBLE + _DEEP_COMPRESS_SEPARATOR.join(summaries)
     
-    print("[compress_to_deep_memory] Payload:", {
-        "chunk": [prompt],
-        "max_tokens": max_tokens,
-        "previous_summary": None,
-        "username": username
-    })
-
     deep_summary = ai_deep_summarize_chunk(
         prompt,
         max_tokens=max_tokens,
@@ -128,16 +126,26 @@ def ensure_history_token_counts(saved_game_id: int, db: Session) -> None:
         saved_game_id: ID of the saved game
         db: Database session
     """
-    entries_needing_counts = db.query(StoryHistory).filter(
+    # Only (id, text) is needed; no ORM instances are built
+    entries_needing_counts = db.query(StoryHistory.id, StoryHistory.text).filter(
         StoryHistory.saved_game_id == saved_game_id,
         StoryHistory.token_count == None
     ).all()
     
     if entries_needing_counts:
-        texts = [entry.text for entry in entries_needing_counts]
-        token_counts = ai_count_tokens_batch(texts)
-        for entry, count in zip(entries_needing_counts, token_counts):
-            entry.token_count = count
+        token_counts = ai_count_tokens_batch([text for _, text in entries_needing_counts])
+        mappings = [
+            {"id": entry_id, "token_count": count}
+            for (entry_id, _), count in zip(entries_needing_counts, token_counts)
+        ]
+        # One executemany UPDATE by primary key instead of an UPDATE per dirtied object
+        db.execute(update(StoryHistory), mappings)
+        # Bulk UPDATE by primary key doesn't touch loaded objects; keep any already in the session current
+        for mapping in mappings:
+            entry = db.identity_map.get(Session.identity_key(StoryHistory, mapping["id"]))
+            if entry is not None:
+                set_committed_value(entry, "token_count", mapping["token_count"])
+        touch_saved_game(saved_game_id, db)
         db.commit()
 
 def get_active_tokenized_chunks(
@@ -199,48 +207,52 @@ def calculate_active_memory_budget(
     Returns:
         Dict with token budget breakdown
     """
-    MAX_TOKENIZED_HISTORY_BLOCK = get_setting('MAX_TOKENIZED_HISTORY_BLOCK', db)
-    TOKENIZE_THRESHOLD = get_setting('TOKENIZE_THRESHOLD', db)
-    
-    # Get all history
-    all_history = db.query(StoryHistory).filter(
-        StoryHistory.saved_game_id == saved_game_id
-    ).order_by(StoryHistory.id).all()
-    
-    # Get active tokenized chunks
-    active_chunks = get_active_tokenized_chunks(
-        saved_game_id,
-        db,
-        max_chunks=MAX_TOKENIZED_HISTORY_BLOCK
+    MAX_TOKENIZED_HISTORY_BLOCK, TOKENIZE_THRESHOLD = get_settings_bulk(
+        ('MAX_TOKENIZED_HISTORY_BLOCK', 'TOKENIZE_THRESHOLD'), db
     )
     
-    # Calculate untokenized history tokens
-    untokenized = [h for h in all_history if not h.is_tokenized]
-    untokenized.reverse()  # Most recent first
+    # Totals are aggregated in SQL; no need to load every history row
+    total_tokens, total_history_entries = db.query(
+        func.coalesce(func.sum(StoryHistory.token_count), 0),
+        func.count(StoryHistory.id)
+    ).filter(StoryHistory.saved_game_id == saved_game_id).one()
     
-    active_history_tokens = 0
-    active_history_count = 0
-    for entry in untokenized:
-        entry_tokens = entry.token_count or 0
-        if active_history_tokens + entry_tokens <= TOKENIZE_THRESHOLD:
-            active_history_tokens += entry_tokens
-            active_history_count += 1
-        else:
-            break
-    
-    # Calculate active tokenized tokens
-    active_tokenized_tokens = sum(chunk.token_count or 0 for chunk in active_chunks)
+    # Count and sum the most recent active tokenized chunks in SQL instead of loading them
+    active_chunk_tokens = db.query(TokenizedHistory.token_count).filter(
+        TokenizedHistory.saved_game_id == saved_game_id,
+        TokenizedHistory.is_tokenized == 0
+    )
+    if MAX_TOKENIZED_HISTORY_BLOCK:
+        # ORDER BY is only valid in a SQL Server subquery together with TOP
+        active_chunk_tokens = active_chunk_tokens.order_by(TokenizedHistory.end_index.desc()).limit(MAX_TOKENIZED_HISTORY_BLOCK)
+    active_chunk_tokens = active_chunk_tokens.subquery()
+    active_tokenized_chunks, active_tokenized_tokens = db.query(
+        func.count(),
+        func.coalesce(func.sum(active_chunk_tokens.c.token_count), 0)
+    ).select_from(active_chunk_tokens).one()
     
-    # Total tokens
-    total_tokens = sum(h.token_count or 0 for h in all_history)
+    # Calculate untokenized history tokens: running total over the most recent entries
+    # (newest first), keeping those that fit under the threshold
+    running_tokens = func.sum(func.coalesce(StoryHistory.token_count, 0)).over(
+        order_by=StoryHistory.id.desc(),
+        rows=(None, 0)
+    ).label("running_tokens")
+    untokenized = db.query(running_tokens).filter(
+        StoryHistory.saved_game_id == saved_game_id,
+        StoryHistory.is_tokenized == 0
+    ).subquery()
+    active_history_count, active_history_tokens = db.query(
+        func.count(),
+        func.coalesce(func.max(untokenized.c.running_tokens), 0)
+    ).filter(untokenized.c.running_tokens <= TOKENIZE_THRESHOLD).one()
     
     return {
         "active_tokens": active_tokenized_tokens + active_history_tokens,
         "total_tokens": total_tokens,
-        "active_tokenized_chunks": len(active_chunks),
+        "active_tokenized_chunks": active_tokenized_chunks,
         "active_tokenized_tokens": active_tokenized_tokens,
         "active_history_entries": active_history_count,
         "active_history_tokens": active_history_tokens,
-        "total_history_entries": len(all_history)
+        "total_history_entries": total_history_entries
     }
 
@@ -2,51 +2,125 @@
 Saved games routes.
 Handles CRUD operations for saved games and related game statistics.
 """
+import asyncio
+import hashlib
 from datetime import datetime, timezone
 from typing import List
-from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, joinedload, raiseload
+import orjson
 
 from business.schemas import SavedGameCreate, SavedGameIdResponse
-from business.dtos import SavedGameDTO, HistoryDTO, TokenizedHistoryDTO, DeepMemoryDTO
 from business.models import User, SavedGame, StoryHistory, TokenizedHistory, DeepMemory
-from business.converters import saved_game_to_dto
-from shared.services.orm_service import get_db
+from business.converters import saved_game_to_dto, history_to_dto, tokenized_history_to_dto, deep_memory_to_dto, dtos_to_payload, convert_tokenized_history
+from shared.services.orm_service import get_db, SessionLocal, no_expire_on_commit
 from shared.services.auth_service import verify_game_ownership, get_current_user
-from shared.helpers.ai_settings import get_setting
+from shared.helpers.ai_settings import get_setting, get_settings_bulk
 from api.services.memory_service import calculate_active_memory_budget
 from api.services.history_service import check_and_tokenize_history
+from api.ai_client_requests import ai_count_tokens_batch_async
 
-async def perform_get_saved_game(
+def _etag(*parts) -> str:
+    """Strong ETag from the values a response depends on."""
+    return '"' + hashlib.blake2b(orjson.dumps(parts), digest_size=12).hexdigest() + '"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return request.headers.get("if-none-match") == etag
+
+def perform_get_saved_game(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get a saved game with all related history, tokenized history, and deep memory.
+    The response body is streamed as the history rows are read.
+    Every write to the game's history, chunks or deep memory bumps SavedGame.updated_at,
+    so an unchanged game answers If-None-Match with 304 without reading any history.
     """
-    game = db.query(SavedGame).filter(SavedGame.id == game_id).first()
-    if not game:
+    # Game, world, rating and history count in one round trip
+    history_count = select(func.count(StoryHistory.id)).where(
+        StoryHistory.saved_game_id == SavedGame.id
+    ).scalar_subquery()
+    # raiseload: any other relationship touched while building the DTO is a bug, not a silent extra query
+    row = db.query(SavedGame, history_count).options(
+        joinedload(SavedGame.world_obj),
+        joinedload(SavedGame.rating_obj),
+        raiseload("*")
+    ).filter(SavedGame.id == game_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Saved game not found")
+    game, game_history_count = row
     if game.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden: not your saved game")
     
-    # Fetch related history, tokenized history, and deep history
-    history = db.query(StoryHistory).filter(StoryHistory.saved_game_id == game_id).all()
-    tokenized_history = db.query(TokenizedHistory).filter(TokenizedHistory.saved_game_id == game_id).all()
-    deep_history = db.query(DeepMemory).filter(DeepMemory.saved_game_id == game_id).all()
-
-    # Build and return the DTO, now including deep_history
-    dto = saved_game_to_dto(game, history, tokenized_history, db)
-    
-    # Convert deep memory to DTOs and add to the DTO
-    deep_history_dtos = [DeepMemoryDTO.model_validate(d) for d in deep_history]
-    dto.deep_history = deep_history_dtos
+    # Game-level fields (world, rating, settings); the history lists are streamed after them
+    # The game owner's tier settings come from the in-process settings cache, not a per-request query
+    ai_settings = get_settings_bulk(
+        ('MAX_TOKENIZED_HISTORY_BLOCK', 'TOKENIZE_THRESHOLD', 'TOKENIZED_HISTORY_BLOCK_SIZE'),
+        db,
+        user_id=game.user_id
+    )
+    game_fields = saved_game_to_dto(game, [], [], db, ai_settings).model_dump(
+        by_alias=True,
+        exclude={"history", "tokenized_history", "deep_history"}
+    )
+    game_fields["history_count"] = game_history_count
     
-    return dto
+    # game_fields carries updated_at, history_count and the world/rating/settings values
+    etag = _etag("saved_game", game_fields)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        _stream_saved_game(game_id, game_fields),
+        media_type="application/json",
+        headers={"ETag": etag}
+    )
+
+# Rows fetched per round-trip while streaming a saved game
+SAVED_GAME_STREAM_BATCH = 500
+
+def _stream_json_array(rows, to_dto):
+    """Yield a JSON array one serialized row at a time."""
+    separator = b"["
+    for row in rows:
+        yield separator + orjson.dumps(to_dto(row).model_dump(by_alias=True))
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+def _stream_saved_game(game_id: int, game_fields: dict):
+    """
+    Stream the saved game JSON while the history rows are fetched, instead of building
+    the whole nested DTO in memory. Runs in the threadpool with its own session, since
+    the request session may be closed before the body is sent.
+    """
+    db = SessionLocal()
+    try:
+        history = db.query(StoryHistory).filter(
+            StoryHistory.saved_game_id == game_id
+        ).order_by(StoryHistory.entry_index).yield_per(SAVED_GAME_STREAM_BATCH)
+        yield orjson.dumps(game_fields)[:-1] + b',"history":'
+        yield from _stream_json_array(history, history_to_dto)
+
+        tokenized_history = db.query(TokenizedHistory).filter(
+            TokenizedHistory.saved_game_id == game_id
+        ).order_by(TokenizedHistory.end_index).yield_per(SAVED_GAME_STREAM_BATCH)
+        yield b',"tokenized_history":'
+        yield from _stream_json_array(tokenized_history, tokenized_history_to_dto)
 
-async def perform_list_tokenized_history(
+        deep_history = db.query(DeepMemory).filter(DeepMemory.saved_game_id == game_id)
+        yield b',"deep_history":'
+        yield from _stream_json_array(deep_history, deep_memory_to_dto)
+        yield b"}"
+    finally:
+        db.close()
+
+def perform_list_tokenized_history(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -54,42 +128,55 @@ async def perform_list_tokenized_history(
     Get tokenized history for a saved game.
     Only returns active tokenized chunks (not compressed into deep memory).
     """
-    game = db.query(SavedGame).filter(SavedGame.id == game_id).first()
+    game = db.get(SavedGame, game_id)
     if not game or game.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden: not your saved game")
     
+    etag = _etag("tokenized_history", game.id, game.updated_at)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
     # Only return active tokenized chunks (not compressed into deep memory)
-    return db.query(TokenizedHistory).filter(
+    chunks = db.query(TokenizedHistory).filter(
         TokenizedHistory.saved_game_id == game_id,
         TokenizedHistory.is_tokenized == 0
     ).all()
+    return ORJSONResponse(
+        content=dtos_to_payload(tokenized_history_to_dto(th) for th in chunks),
+        headers={"ETag": etag}
+    )
 
-async def perform_get_deep_memory(
+def perform_get_deep_memory(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get the ultra-compressed deep memory for ancient history (if it exists).
     """
-    game = db.query(SavedGame).filter(SavedGame.id == game_id).first()
+    game = db.get(SavedGame, game_id)
     if not game or game.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden: not your saved game")
     
+    etag = _etag("deep_memory", game.id, game.updated_at)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
     deep_memory = db.query(DeepMemory).filter(DeepMemory.saved_game_id == game_id).first()
     if not deep_memory:
-        return {}  # Return empty object for consistency
+        return ORJSONResponse(content={}, headers={"ETag": etag})  # Return empty object for consistency
     
-    return {
+    return ORJSONResponse(content={
         "id": deep_memory.id,
         "summary": deep_memory.summary,
         "token_count": deep_memory.token_count,
         "chunks_merged": deep_memory.chunks_merged,
         "last_merged_end_index": deep_memory.last_merged_end_index,
         "updated_at": deep_memory.updated_at
-    }
+    }, headers={"ETag": etag})
 
-async def perform_get_token_stats(
+def perform_get_token_stats(
     game_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -102,7 +189,7 @@ async def perform_get_token_stats(
     verify_game_ownership(game_id, current_user.id, db)
     return calculate_active_memory_budget(game_id, db)
 
-async def perform_update_saved_game(
+def perform_update_saved_game(
     game_id: int,
     game_data: SavedGameCreate,
     db: Session = Depends(get_db),
@@ -117,8 +204,9 @@ async def perform_update_saved_game(
     game.player_name = game_data.player_name
     game.player_gender = game_data.player_gender
     game.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(game)
+    # Every column was just loaded or set, so keep them instead of re-selecting the row
+    with no_expire_on_commit(db):
+        db.commit()
     return game
 
 async def perform_create_saved_game(
@@ -133,50 +221,51 @@ async def perform_create_saved_game(
     if game_data.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden: user mismatch")
     
+    # Count the initial history before opening the transaction, so no rows stay locked across the AI call.
+    # The counts come from the texts already in memory, so tokenization doesn't re-read the rows to count them
+    token_counts = await ai_count_tokens_batch_async([entry.entry for entry in game_data.history]) if game_data.history else []
+    
+    # One timestamp for created/updated; the initial history rows get created_at from the database
+    now = datetime.now(timezone.utc)
     new_game = SavedGame(
         user_id=game_data.user_id,
         world_id=game_data.world_id,
         rating_id=game_data.rating_id,
         player_name=game_data.player_name,
         player_gender=game_data.player_gender,
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc)
+        created_at=now,
+        updated_at=now
     )
     db.add(new_game)
-    db.commit()
-    db.refresh(new_game)
+    # Flush assigns the id; the game and its initial rows commit together below
+    db.flush()
+    new_game_id = new_game.id
 
-    # Save history entries if provided
+    # Save history entries if provided (one multi-row INSERT instead of one per entry)
     if game_data.history:
-        for idx, entry in enumerate(game_data.history):
-            new_history = StoryHistory(
-                saved_game_id=new_game.id,
-                entry_index=idx,
-                text=entry.entry,
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(new_history)
+        db.execute(insert(StoryHistory), [
+            {
+                "saved_game_id": new_game_id,
+                "entry_index": idx,
+                "text": entry.entry,
+                "token_count": token_count,
+                "is_tokenized": 0
+            }
+            for idx, (entry, token_count) in enumerate(zip(game_data.history, token_counts))
+        ])
 
     # Save tokenized history blocks if provided
     if game_data.tokenized_history:
-        for th in game_data.tokenized_history:
-            new_th = TokenizedHistory(
-                saved_game_id=new_game.id,
-                start_index=th.start_index,
-                end_index=th.end_index,
-                summary=th.summary,
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(new_th)
+        db.execute(insert(TokenizedHistory), convert_tokenized_history(new_game_id, game_data.tokenized_history))
 
     db.commit()
     
-    # Ensure initial history entries get token counts
-    check_and_tokenize_history(new_game.id, db, username=current_user.username)
+    # Compress the initial history if it is already over the threshold (blocking AI calls, keep them off the event loop)
+    await asyncio.to_thread(check_and_tokenize_history, new_game_id, db, username=current_user.username)
     
-    return {"id": new_game.id}
+    return {"id": new_game_id}
 
-async def perform_delete_saved_game(
+def perform_delete_saved_game(
     game_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
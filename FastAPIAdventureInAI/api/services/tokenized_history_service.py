@@ -2,21 +2,20 @@
 Tokenized history routes.
 Handles compressed chunks of story history for memory efficiency.
 """
-from datetime import datetime, timezone
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends
 from sqlalchemy.orm import Session
 
 
-from business.schemas import TokenizedHistoryIn
+from business.schemas import TokenizedHistoryIn, TokenizedHistoryUpdate
 from business.dtos import TokenizedHistoryDTO
 from business.models import User, TokenizedHistory
 from business.converters import tokenized_history_to_dto
 from api.services.memory_service import update_text_with_token_count
-from shared.services.orm_service import get_db
-from shared.services.auth_service import verify_game_ownership, get_current_user
+from shared.services.orm_service import get_db, touch_saved_game
+from shared.services.auth_service import verify_game_ownership, get_owned_game_row, get_current_user
 
-async def perform_create_tokenized_history_entry(
+def perform_create_tokenized_history_entry(
     th_data: TokenizedHistoryIn,
     saved_game_id: int,
     db: Session = Depends(get_db),
@@ -32,17 +31,19 @@ async def perform_create_tokenized_history_entry(
         saved_game_id=saved_game_id,
         start_index=th_data.start_index,
         end_index=th_data.end_index,
-        summary=th_data.summary,
-        created_at=datetime.now(timezone.utc)
+        summary=th_data.summary
     )
     db.add(new_th)
+    touch_saved_game(saved_game_id, db)
+    # Flush fills in id/created_at; build the response before commit instead of refreshing after it
+    db.flush()
+    result = tokenized_history_to_dto(new_th)
     db.commit()
-    db.refresh(new_th)
-    return tokenized_history_to_dto(new_th)
+    return result
 
-async def perform_update_tokenized_history_entry(
+def perform_update_tokenized_history_entry(
     tokenized_id: int,
-    update_data: dict,
+    update_data: TokenizedHistoryUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -50,14 +51,11 @@ async def perform_update_tokenized_history_entry(
     Update a tokenized history entry.
     Recalculates token count when summary is modified.
     """
-    tokenized_entry = db.query(TokenizedHistory).filter(TokenizedHistory.id == tokenized_id).first()
-    if not tokenized_entry:
-        raise HTTPException(status_code=404, detail="Tokenized history entry not found")
+    tokenized_entry = get_owned_game_row(TokenizedHistory, tokenized_id, current_user.id, db, "Tokenized history entry not found")
     
-    verify_game_ownership(tokenized_entry.saved_game_id, current_user.id, db)
-    
-    # Update allowed fields
-    if "summary" in update_data:
+    # Update only the fields the client sent (validated by TokenizedHistoryUpdate)
+    update_data = update_data.model_dump(exclude_unset=True)
+    if "summary" in update_data and (update_data["summary"] != tokenized_entry.summary or tokenized_entry.token_count is None):
         tokenized_entry.summary = update_data["summary"]
         # Recalculate token count for the modified summary
         update_text_with_token_count(tokenized_entry.summary, tokenized_entry)
@@ -66,22 +64,21 @@ async def perform_update_tokenized_history_entry(
     if "end_index" in update_data:
         tokenized_entry.end_index = update_data["end_index"]
     
+    # All values are known here, so build the response before commit instead of refreshing after it
+    result = tokenized_history_to_dto(tokenized_entry)
+    touch_saved_game(tokenized_entry.saved_game_id, db)
     db.commit()
-    db.refresh(tokenized_entry)
-    return tokenized_history_to_dto(tokenized_entry)
+    return result
 
-async def perform_delete_tokenized_history_entry(
+def perform_delete_tokenized_history_entry(
     tokenized_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a tokenized history chunk."""
-    tokenized_entry = db.query(TokenizedHistory).filter(TokenizedHistory.id == tokenized_id).first()
-    if not tokenized_entry:
-        raise HTTPException(status_code=404, detail="Tokenized history entry not found")
-    
-    verify_game_ownership(tokenized_entry.saved_game_id, current_user.id, db)
+    tokenized_entry = get_owned_game_row(TokenizedHistory, tokenized_id, current_user.id, db, "Tokenized history entry not found")
     
     db.delete(tokenized_entry)
+    touch_saved_game(tokenized_entry.saved_game_id, db)
     db.commit()
     return {"detail": "Tokenized history entry deleted"}
@@ -4,16 +4,19 @@ Handles user CRUD operations and user-specific queries.
 """
 from typing import List
 from fastapi import Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from business.schemas import UserCreate
 from business.dtos import UserDTO, WorldDTO, SavedGameDTO, AccountLevelDTO
 from business.models import User, World, SavedGame, StoryHistory, GameRating
-from business.converters import user_to_dto, world_to_dto, account_level_to_dto
-from shared.services.orm_service import get_db
+from business.converters import user_to_dto, world_row_to_dto, account_level_to_dto, dtos_to_payload
+from shared.services.orm_service import get_db, no_expire_on_commit
 from shared.services.auth_service import get_current_user, get_user_by_username
+from api.services.worlds_service import select_world_rows
 
-async def perform_get_account_level_me(
+def perform_get_account_level_me(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -22,25 +25,26 @@ async def perform_get_account_level_me(
         raise HTTPException(status_code=404, detail="Account level not found")
     return account_level_to_dto(account_level)
 
-async def perform_create_user(user: UserCreate, db: Session = Depends(get_db)):
+def perform_create_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     Create a new user.
     Note: For authentication/registration, use the /register endpoint instead.
     """
     db_user = User(username=user.username, email=user.email)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # The INSERT returns the generated columns; keep them across the commit instead of refreshing
+    with no_expire_on_commit(db):
+        db.commit()
     return db_user
 
-async def perform_get_user(user_id: int, db: Session = Depends(get_db)):
+def perform_get_user(user_id: int, db: Session = Depends(get_db)):
     """Get user by ID."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user_to_dto(user)
 
-async def perform_get_user_by_username_endpoint(
+def perform_get_user_by_username_endpoint(
     username: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -54,15 +58,15 @@ async def perform_get_user_by_username_endpoint(
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-async def perform_list_my_worlds(
+def perform_list_my_worlds(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all worlds belonging to the current authenticated user."""
-    worlds = db.query(World).filter(World.user_id == current_user.id).all()
-    return [world_to_dto(w, calculate_tokens=True) for w in worlds]
+    rows = db.execute(select_world_rows(World.user_id == current_user.id)).all()
+    return ORJSONResponse(content=dtos_to_payload(world_row_to_dto(row) for row in rows))
 
-async def perform_list_user_saved_games(
+def perform_list_user_saved_games(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -74,31 +78,62 @@ async def perform_list_user_saved_games(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden: user mismatch")
     
-    games = db.query(SavedGame).filter(SavedGame.user_id == user_id).all()
+    # One query for just the listed columns: games with their world and rating joined in and the
+    # history count and token total aggregated per game in one GROUP BY (no per-game token_stats calls)
+    history_stats = select(
+        StoryHistory.saved_game_id,
+        func.count(StoryHistory.id).label("history_count"),
+        func.coalesce(func.sum(StoryHistory.token_count), 0).label("total_tokens")
+    ).where(
+        StoryHistory.saved_game_id.in_(select(SavedGame.id).where(SavedGame.user_id == user_id))
+    ).group_by(StoryHistory.saved_game_id).subquery()
+    rows = db.execute(
+        select(
+            SavedGame.id,
+            SavedGame.user_id,
+            SavedGame.world_id,
+            SavedGame.rating_id,
+            SavedGame.player_name,
+            SavedGame.player_gender,
+            SavedGame.created_at,
+            SavedGame.updated_at,
+            func.coalesce(history_stats.c.history_count, 0).label("history_count"),
+            func.coalesce(history_stats.c.total_tokens, 0).label("total_tokens"),
+            World.name.label("world_name"),
+            World.world_tokens,
+            World.preface.label("world_preface"),
+            GameRating.name.label("rating_name"),
+            GameRating.ai_prompt
+        ).outerjoin(
+            history_stats, history_stats.c.saved_game_id == SavedGame.id
+        ).outerjoin(
+            World, World.id == SavedGame.world_id
+        ).outerjoin(
+            GameRating, GameRating.id == SavedGame.rating_id
+        ).where(SavedGame.user_id == user_id)
+    ).all()
     result = []
-    for game in games:
-        history_count = db.query(StoryHistory).filter(StoryHistory.saved_game_id == game.id).count()
-        world = db.query(World).filter(World.id == game.world_id).first()
-        rating = db.query(GameRating).filter(GameRating.id == game.rating_id).first()
-        
-        dto = SavedGameDTO(
-            id=game.id,
-            user_id=game.user_id,
-            world_id=game.world_id,
-            rating_id=game.rating_id,
-            player_name=game.player_name,
-            player_gender=game.player_gender,
-            history_count=history_count,
-            world_name=world.name if world else "",
-            world_tokens=world.world_tokens if world else "",
-            world_preface=world.preface if world else "",
-            rating_name=rating.name if rating else "",
-            story_splitter=f"# Continue {rating.ai_prompt} after the player action." if rating else "###",
+    for row in rows:
+        # Values come straight from the DB, so skip validation
+        dto = SavedGameDTO.model_construct(
+            id=row.id,
+            user_id=row.user_id,
+            world_id=row.world_id,
+            rating_id=row.rating_id,
+            player_name=row.player_name,
+            player_gender=row.player_gender,
+            history_count=row.history_count,
+            total_tokens=row.total_tokens,
+            world_name=row.world_name or "",
+            world_tokens=row.world_tokens or "",
+            world_preface=row.world_preface or "",
+            rating_name=row.rating_name or "",
+            story_splitter=f"# Continue {row.ai_prompt} after the player action." if row.ai_prompt is not None else "###",
             history=[],  # Empty list for summary
             tokenized_history=[],  # Empty list for summary
             deep_history=[],  # Empty list for summary
-            created_at=game.created_at,
-            updated_at=game.updated_at
+            created_at=row.created_at,
+            updated_at=row.updated_at
         )
         result.append(dto)
-    return result
+    return ORJSONResponse(content=dtos_to_payload(result))
@@ -1,24 +1,69 @@
+import asyncio
+import time
 from typing import List
 from fastapi import Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from business.dtos import WorldDTO
+from business.schemas import WorldUpdate
 from business.models import User, World
-from business.converters import world_to_dto
+from business.converters import world_to_dto, world_row_to_dto, dtos_to_payload
 from aiadventureinpythonconstants import MAX_WORLD_TOKENS # THIS NEEDS TO BE REMOVED OR WE NEED TO DO IT MORE
-from api.services.memory_service import ai_count_tokens_batch
-from api.ai_client_requests import ai_count_tokens_batch
+from api.ai_client_requests import ai_count_tokens_batched
 from shared.helpers.ai_settings import get_setting
 from shared.services.auth_service import get_current_user
 from shared.services.orm_service import get_db
 
-async def perform_list_worlds(db: Session = Depends(get_db)):
+def select_world_rows(*criteria):
+    """SELECT of just the WorldDTO columns, game_count included (World.game_count's correlated subquery)."""
+    return select(
+        World.id,
+        World.user_id,
+        World.name,
+        World.preface,
+        World.world_tokens,
+        World.created_at,
+        World.updated_at,
+        World.token_count,
+        World.game_count
+    ).where(*criteria)
+
+# The public world list is read far more often than worlds change: serve it from memory
+# for up to WORLDS_CACHE_SECONDS, dropping it whenever this process writes a world
+# (other worker processes pick up the change when their copy expires)
+WORLDS_CACHE_SECONDS = 60
+_worlds_cache = None  # (monotonic time built, payload)
+
+def clear_worlds_cache():
+    global _worlds_cache
+    _worlds_cache = None
+
+def perform_list_worlds(db: Session = Depends(get_db)):
     """
     Get all worlds.
     No authentication required.
     """
-    worlds = db.query(World).all()
-    return [world_to_dto(w, calculate_tokens=False) for w in worlds]
+    global _worlds_cache
+    cached = _worlds_cache
+    if cached is None or time.monotonic() - cached[0] > WORLDS_CACHE_SECONDS:
+        rows = db.execute(select_world_rows()).all()
+        cached = (time.monotonic(), dtos_to_payload(world_row_to_dto(row) for row in rows))
+        _worlds_cache = cached
+    return ORJSONResponse(content=cached[1])
+
+def _flush_world(db: Session):
+    """
+    Flush a new or changed world. World.name is unique in the schema, so a duplicate name
+    fails here instead of needing a SELECT probe first (and can't race past one).
+    """
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="World name already exists")
 
 async def perform_create_world(
     world_data: dict,
@@ -29,14 +74,9 @@ async def perform_create_world(
     Create a new world for the authenticated user.
     Validates world name uniqueness and token count limits.
     """
-    # Check if world name already exists
-    existing = db.query(World).filter(World.name == world_data["name"]).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="World name already exists")
-    
     # Validate token count
     combined_text = f"{world_data['name']} {world_data['world_tokens']}" # remove preface {world_data['preface']}
-    token_count = ai_count_tokens_batch([combined_text])[0]
+    token_count = await ai_count_tokens_batched(combined_text)
     max_world_tokens = get_setting('MAX_WORLD_TOKENS', db)
     if max_world_tokens is None:
         max_world_tokens = MAX_WORLD_TOKENS
@@ -53,14 +93,23 @@ async def perform_create_world(
         world_tokens=world_data["world_tokens"],
         token_count=token_count
     )
-    db.add(new_world)
-    db.commit()
-    db.refresh(new_world)
-    return world_to_dto(new_world, calculate_tokens=False)
+    
+    # Blocking DB work runs in a worker thread, as in register, so the event loop keeps
+    # serving other requests (there is no async MSSQL driver)
+    def _insert_world():
+        db.add(new_world)
+        _flush_world(db)
+        result = world_to_dto(new_world, calculate_tokens=False, game_count=0)
+        db.commit()
+        return result
+    
+    result = await asyncio.to_thread(_insert_world)
+    clear_worlds_cache()
+    return result
 
 async def perform_update_world(
     world_id: int,
-    world_data: dict,
+    world_data: WorldUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -68,7 +117,7 @@ async def perform_update_world(
     Update an existing world.
     Only the owner can update their world.
     """
-    world = db.query(World).filter(World.id == world_id).first()
+    world = await asyncio.to_thread(db.get, World, world_id)
     if not world:
         raise HTTPException(status_code=404, detail="World not found")
     
@@ -76,18 +125,19 @@ async def perform_update_world(
     if world.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden: you can only edit your own worlds")
     
-    # Check if new name conflicts with another world
-    if "name" in world_data and world_data["name"] != world.name:
-        existing = db.query(World).filter(World.name == world_data["name"]).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="World name already exists")
+    # Only the fields the client sent (validated by WorldUpdate)
+    world_data = world_data.model_dump(exclude_unset=True)
     
     # Build updated text for token validation
     updated_name = world_data.get("name", world.name)
     updated_preface = world_data.get("preface", world.preface)
     updated_world_tokens = world_data.get("world_tokens", world.world_tokens)
-    combined_text = f"{updated_name} {updated_world_tokens}" #{updated_preface}
-    token_count = ai_count_tokens_batch([combined_text])[0]
+    if updated_name == world.name and updated_world_tokens == world.world_tokens and world.token_count is not None:
+        # Counted text (name + world_tokens) is unchanged, the stored count is still valid
+        token_count = world.token_count
+    else:
+        combined_text = f"{updated_name} {updated_world_tokens}" #{updated_preface}
+        token_count = await ai_count_tokens_batched(combined_text)
     max_world_tokens = get_setting('MAX_WORLD_TOKENS', db)
     if max_world_tokens is None:
         max_world_tokens = MAX_WORLD_TOKENS
@@ -102,12 +152,20 @@ async def perform_update_world(
     world.preface = updated_preface
     world.world_tokens = updated_world_tokens
     world.token_count = token_count
-    db.commit()
-    db.refresh(world)
-    return world_to_dto(world, calculate_tokens=False)
+    
+    def _save_world():
+        # Flush applies updated_at (and rejects a taken name); build the response before commit instead of refreshing after it
+        _flush_world(db)
+        result = world_to_dto(world, calculate_tokens=False)
+        db.commit()
+        return result
+    
+    result = await asyncio.to_thread(_save_world)
+    clear_worlds_cache()
+    return result
 
 
-async def perform_delete_world(
+def perform_delete_world(
     world_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -116,7 +174,7 @@ async def perform_delete_world(
     Delete a world.
     Only the owner can delete their world.
     """
-    world = db.query(World).filter(World.id == world_id).first()
+    world = db.get(World, world_id)
     if not world:
         raise HTTPException(status_code=404, detail="World not found")
     
@@ -126,4 +184,5 @@ async def perform_delete_world(
     
     db.delete(world)
     db.commit()
+    clear_worlds_cache()
     return None
@@ -4,21 +4,29 @@ Converters for transforming database models to DTOs.
 from .converters import (
     user_to_dto,
     world_to_dto,
+    world_row_to_dto,
     game_rating_to_dto,
     saved_game_to_dto,
     history_to_dto,
     tokenized_history_to_dto,
+    deep_memory_to_dto,
+    convert_tokenized_history,
     serialize_for_json,
+    dtos_to_payload,
     account_level_to_dto
 )
 
 __all__ = [
     "user_to_dto",
     "world_to_dto",
+    "world_row_to_dto",
     "game_rating_to_dto",
     "saved_game_to_dto",
     "history_to_dto",
     "tokenized_history_to_dto",
+    "deep_memory_to_dto",
+    "convert_tokenized_history",
     "serialize_for_json",
+    "dtos_to_payload",
     "account_level_to_dto"
 ]
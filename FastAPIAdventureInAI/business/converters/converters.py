@@ -1,6 +1,6 @@
-from datetime import datetime, timezone
-from business.models import User, World, GameRating, SavedGame, StoryHistory, TokenizedHistory, AccountLevel, AIDirectiveSettings
-from business.dtos import UserDTO, WorldDTO, GameRatingDTO, SavedGameDTO, HistoryDTO, TokenizedHistoryDTO, AccountLevelDTO, AIDirectiveSettingsDTO
+from datetime import datetime
+from business.models import User, World, GameRating, SavedGame, StoryHistory, TokenizedHistory, DeepMemory, AccountLevel, AIDirectiveSettings
+from business.dtos import UserDTO, WorldDTO, GameRatingDTO, SavedGameDTO, HistoryDTO, TokenizedHistoryDTO, DeepMemoryDTO, AccountLevelDTO, AIDirectiveSettingsDTO
 
 def account_level_to_dto(account_level: AccountLevel) -> AccountLevelDTO:
     # Let Pydantic map all fields from the SQLAlchemy model via from_attributes
@@ -9,9 +9,11 @@ def account_level_to_dto(account_level: AccountLevel) -> AccountLevelDTO:
 def user_to_dto(user: User) -> UserDTO:
     return UserDTO.model_validate(user)
 
-def world_to_dto(world: World, calculate_tokens: bool = True) -> WorldDTO:
-    # Count the number of saved games using this world
-    game_count = len(world.saved_games) if hasattr(world, 'saved_games') else 0
+def world_to_dto(world: World, calculate_tokens: bool = True, game_count: int = None) -> WorldDTO:
+    # Number of saved games using this world: the SQL-side World.game_count (a COUNT subquery,
+    # loaded on first access if the query didn't undefer it) unless the caller already knows it
+    if game_count is None:
+        game_count = world.game_count
     # Use stored token_count if available
     token_count = world.token_count
     return WorldDTO(
@@ -26,12 +28,18 @@ def world_to_dto(world: World, calculate_tokens: bool = True) -> WorldDTO:
         token_count=token_count
     )
 
+def world_row_to_dto(row) -> WorldDTO:
+    """Build a WorldDTO from a column row (World columns plus game_count); values come straight from the DB."""
+    return WorldDTO.model_construct(**row._mapping)
+
 def game_rating_to_dto(rating: GameRating) -> GameRatingDTO:
     return GameRatingDTO.model_validate(rating)
 
+# Rows read back from the DB were validated on write, so the history converters use
+# model_construct and skip Pydantic validation (these run once per row on game load)
 def history_to_dto(history: StoryHistory) -> HistoryDTO:
     # Convert is_tokenized from integer (0/1) to boolean
-    return HistoryDTO(
+    return HistoryDTO.model_construct(
         id=history.id,
         saved_game_id=history.saved_game_id,
         entry_index=history.entry_index,
@@ -41,9 +49,29 @@ def history_to_dto(history: StoryHistory) -> HistoryDTO:
     )
 
 def tokenized_history_to_dto(th: TokenizedHistory) -> TokenizedHistoryDTO:
-    return TokenizedHistoryDTO.model_validate(th)
+    return TokenizedHistoryDTO.model_construct(
+        id=th.id,
+        saved_game_id=th.saved_game_id,
+        start_index=th.start_index,
+        end_index=th.end_index,
+        summary=th.summary,
+        token_count=th.token_count,
+        history_references=th.history_references,
+        created_at=th.created_at
+    )
 
-def saved_game_to_dto(game: SavedGame, history_list, tokenized_history_list, db=None) -> SavedGameDTO:
+def deep_memory_to_dto(deep_memory: DeepMemory) -> DeepMemoryDTO:
+    return DeepMemoryDTO.model_construct(
+        id=deep_memory.id,
+        saved_game_id=deep_memory.saved_game_id,
+        summary=deep_memory.summary,
+        token_count=deep_memory.token_count,
+        chunks_merged=deep_memory.chunks_merged,
+        last_merged_end_index=deep_memory.last_merged_end_index,
+        updated_at=deep_memory.updated_at
+    )
+
+def saved_game_to_dto(game: SavedGame, history_list, tokenized_history_list, db=None, ai_settings=None) -> SavedGameDTO:
     # Fetch world and rating names and details
     world_name = ""
     world_tokens = ""
@@ -51,21 +79,22 @@ def saved_game_to_dto(game: SavedGame, history_list, tokenized_history_list, db=
     rating_name = ""
     story_splitter = "###"
     try:
-        if hasattr(game, "world") and game.world:
-            world_name = game.world.name
-            world_tokens = game.world.world_tokens
-            world_preface = game.world.preface
+        # Relationship access is free when the caller eager-loaded world_obj / rating_obj
+        if game.world_obj:
+            world_name = game.world_obj.name
+            world_tokens = game.world_obj.world_tokens
+            world_preface = game.world_obj.preface
         elif db:
-            world = db.query(World).filter(World.id == game.world_id).first()
+            world = db.get(World, game.world_id)
             if world:
                 world_name = world.name
                 world_tokens = world.world_tokens
                 world_preface = world.preface
-        if hasattr(game, "rating") and game.rating:
-            rating_name = game.rating.name
-            story_splitter = f"# Continue {game.rating.ai_prompt} after the player action."
+        if game.rating_obj:
+            rating_name = game.rating_obj.name
+            story_splitter = f"# Continue {game.rating_obj.ai_prompt} after the player action."
         elif db:
-            rating = db.query(GameRating).filter(GameRating.id == game.rating_id).first()
+            rating = db.get(GameRating, game.rating_id)
             if rating:
                 rating_name = rating.name
                 story_splitter = f"# Continue {rating.ai_prompt} after the player action."
@@ -78,15 +107,29 @@ def saved_game_to_dto(game: SavedGame, history_list, tokenized_history_list, db=
 
     # Get game settings
     # Use default values since settings are game-specific and we don't have all context here
-    # Need AIDirectiveSettings found from User.account_level_id to AccountLevel.game_settings_id
-    user = db.query(User).filter(User.id == game.user_id).first()
-    account_level = db.query(AccountLevel).filter(AccountLevel.id == user.account_level_id).first() if user else None
-    ai_settings = db.query(AIDirectiveSettings).filter(AIDirectiveSettings.id == account_level.game_settings_id).first() if account_level else None
-    max_tokenized_history_block = ai_settings.max_tokenized_history_block if ai_settings and ai_settings.max_tokenized_history_block is not None else 4
-    tokenize_threshold = ai_settings.tokenize_threshold if ai_settings and ai_settings.tokenize_threshold is not None else 800
-    tokenized_history_block_size = ai_settings.tokenized_history_block_size if ai_settings and ai_settings.tokenized_history_block_size is not None else 200
+    # Callers with the settings cache pass (max_tokenized_history_block, tokenize_threshold,
+    # tokenized_history_block_size); otherwise find AIDirectiveSettings from
+    # User.account_level_id to AccountLevel.game_settings_id (one joined SELECT instead of a get per hop)
+    if ai_settings is None:
+        settings = db.query(AIDirectiveSettings).join(
+            AccountLevel, AccountLevel.game_settings_id == AIDirectiveSettings.id
+        ).join(
+            User, User.account_level_id == AccountLevel.id
+        ).filter(User.id == game.user_id).first()
+        ai_settings = (
+            settings.max_tokenized_history_block,
+            settings.tokenize_threshold,
+            settings.tokenized_history_block_size
+        ) if settings else (None, None, None)
+    max_tokenized_history_block, tokenize_threshold, tokenized_history_block_size = ai_settings
+    if max_tokenized_history_block is None:
+        max_tokenized_history_block = 4
+    if tokenize_threshold is None:
+        tokenize_threshold = 800
+    if tokenized_history_block_size is None:
+        tokenized_history_block_size = 200
     
-    return SavedGameDTO(
+    return SavedGameDTO.model_construct(
         id=game.id,
         user_id=game.user_id,
         world_id=game.world_id,
@@ -120,17 +163,28 @@ def saved_game_to_dto(game: SavedGame, history_list, tokenized_history_list, db=
 #     ]
 
 def convert_tokenized_history(saved_game_id, th_list):
+    """
+    Row dicts for a Core db.execute(insert(TokenizedHistory), rows): one multi-row INSERT
+    with no ORM objects or per-row unit-of-work. created_at is filled in by the database.
+    """
     return [
-        TokenizedHistory(
-            saved_game_id=saved_game_id,
-            start_index=th.start_index,
-            end_index=th.end_index,
-            summary=th.summary,
-            created_at=datetime.now(timezone.utc)
-        )
+        {
+            "saved_game_id": saved_game_id,
+            "start_index": th.start_index,
+            "end_index": th.end_index,
+            "summary": th.summary,
+            "is_tokenized": 0
+        }
         for th in th_list or []
     ]
 
+def dtos_to_payload(dtos) -> list:
+    """
+    Dump DTOs to plain dicts (by alias, as FastAPI's response_model would) so endpoints
+    can return an ORJSONResponse directly and skip jsonable_encoder and revalidation.
+    """
+    return [dto.model_dump(by_alias=True) for dto in dtos]
+
 def serialize_for_json(obj):
     if isinstance(obj, dict):
         return {k: serialize_for_json(v) for k, v in obj.items()}
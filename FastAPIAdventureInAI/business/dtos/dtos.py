@@ -101,6 +101,7 @@ class SavedGameDTO(BaseModel):
     player_name: str
     player_gender: str
     history_count: int
+    total_tokens: Optional[int] = None  # Sum of the history token counts (filled in by the saved game list)
     world_name: str
     world_tokens: str
     world_preface: str
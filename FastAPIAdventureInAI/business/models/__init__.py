@@ -12,6 +12,7 @@ from .models import (
     Session as SessionModel,
     AIDirectiveSettings,
     AccountLevel,
+    tokenized_history_refs,
     Base
 )
 
@@ -26,5 +27,6 @@ __all__ = [
     "DeepMemory",
     "SessionModel",
     "AIDirectiveSettings",
-    "AccountLevel"
+    "AccountLevel",
+    "tokenized_history_refs"
 ]
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index, Table, func, select
+from sqlalchemy.orm import declarative_base, relationship, column_property
 from datetime import datetime
 
 Base = declarative_base()
@@ -33,6 +33,7 @@ class AccountLevel(Base):
     game_settings = relationship("AIDirectiveSettings")
     users = relationship("User", back_populates="account_level")
 
+# Models with eager_defaults get their server defaults back from the INSERT/UPDATE (OUTPUT), no refresh SELECT
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
@@ -44,6 +45,7 @@ class User(Base):
     account_level = relationship("AccountLevel", back_populates="users")
     saved_games = relationship("SavedGame", back_populates="user")
     worlds = relationship("World", back_populates="user")
+    __mapper_args__ = {"eager_defaults": True}
 
 class SavedGame(Base):
     __tablename__ = "saved_games"
@@ -55,12 +57,35 @@ class SavedGame(Base):
     player_gender = Column(String(16), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    processing_since = Column(DateTime, nullable=True)  # Set while a worker compresses this game's history (see claim_saved_game)
     user = relationship("User", back_populates="saved_games")
     world_obj = relationship("World", back_populates="saved_games")
     rating_obj = relationship("GameRating", back_populates="saved_games")
     story_history = relationship("StoryHistory", back_populates="saved_game", cascade="all, delete-orphan")
     tokenized_history = relationship("TokenizedHistory", back_populates="saved_game", cascade="all, delete-orphan")
     deep_memory = relationship("DeepMemory", back_populates="saved_game", uselist=False, cascade="all, delete-orphan")
+    __table_args__ = (
+        # A user's game list filters on the owner; SQL Server doesn't index foreign keys on its own
+        # (ownership checks by id are already covered by the clustered primary key)
+        Index("ix_saved_games_user", "user_id"),
+    )
+
+# Number of saved games using a world, computed in SQL (declared here since it needs SavedGame).
+# Deferred: only queries that read it pay for the subquery, and it never loads the saved game rows
+World.game_count = column_property(
+    select(func.count(SavedGame.id)).where(SavedGame.world_id == World.id).correlate_except(SavedGame).scalar_subquery(),
+    deferred=True
+)
+
+# Association between a tokenized chunk and the StoryHistory entries it summarizes
+tokenized_history_refs = Table(
+    "tokenized_history_refs",
+    Base.metadata,
+    Column("tokenized_history_id", Integer, ForeignKey("tokenized_history.id"), primary_key=True),
+    Column("story_history_id", Integer, ForeignKey("story_history.id"), primary_key=True),
+    # Reverse lookup: which chunks reference a given history entry
+    Index("ix_tokhist_refs_story", "story_history_id")
+)
 
 class StoryHistory(Base):
     __tablename__ = "story_history"
@@ -70,8 +95,18 @@ class StoryHistory(Base):
     text = Column(Text, nullable=False)
     token_count = Column(Integer, nullable=True)  # Calculated token count for this entry
     is_tokenized = Column(Integer, default=0, nullable=False)  # 0=False, 1=True (SQLite compatibility)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.sysutcdatetime())  # filled in by the database
     saved_game = relationship("SavedGame", back_populates="story_history")
+    tokenized_chunks = relationship("TokenizedHistory", secondary=tokenized_history_refs, back_populates="entries")
+    __table_args__ = (
+        # Per-game history is always filtered by game and ordered/ranged by entry_index
+        Index("ix_story_history_game_idx", "saved_game_id", "entry_index"),
+        # Tokenization reads only the untokenized tail of a game, in entry order
+        Index("ix_story_history_game_tok_idx", "saved_game_id", "is_tokenized", "entry_index"),
+        # Filtered index: ensure_history_token_counts only looks for rows still missing a count
+        Index("ix_story_history_game_uncounted", "saved_game_id", mssql_where=token_count.is_(None)),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
 class TokenizedHistory(Base):
     __tablename__ = "tokenized_history"
@@ -82,9 +117,16 @@ class TokenizedHistory(Base):
     summary = Column(Text, nullable=False)
     token_count = Column(Integer, nullable=True)  # Token count of the summary
     is_tokenized = Column(Integer, default=0, nullable=False)  # 0=Active, 1=Compressed into deep memory
-    history_references = Column(Text, nullable=True)  # Comma-separated StoryHistory IDs
-    created_at = Column(DateTime, default=datetime.utcnow)
+    history_references = Column(Text, nullable=True)  # Comma-separated StoryHistory IDs (kept in sync with entries for the API)
+    created_at = Column(DateTime, server_default=func.sysutcdatetime())  # filled in by the database
     saved_game = relationship("SavedGame", back_populates="tokenized_history")
+    entries = relationship("StoryHistory", secondary=tokenized_history_refs, back_populates="tokenized_chunks")
+    __table_args__ = (
+        Index("ix_tokhist_game_end", "saved_game_id", "end_index"),
+        # Active/compressed chunk lookups filter on the flag and order by end_index
+        Index("ix_tokhist_game_istok_end", "saved_game_id", "is_tokenized", "end_index"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
 class DeepMemory(Base):
     """
@@ -99,9 +141,10 @@ class DeepMemory(Base):
     token_count = Column(Integer, nullable=True)  # Token count of the summary
     chunks_merged = Column(Integer, default=0)  # How many tokenized chunks have been merged
     last_merged_end_index = Column(Integer, nullable=True)  # Track up to which history index we've compressed
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.sysutcdatetime())  # filled in by the database
+    updated_at = Column(DateTime, server_default=func.sysutcdatetime(), onupdate=func.sysutcdatetime())
     saved_game = relationship("SavedGame", back_populates="deep_memory")
+    __mapper_args__ = {"eager_defaults": True}
     
 class Session(Base):
     __tablename__ = "sessions"
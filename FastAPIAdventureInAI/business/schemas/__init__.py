@@ -6,8 +6,11 @@ from business.schemas.schemas_api import (
     UserRegister,
     Token,
     HistoryEntryIn,
+    HistoryEntryUpdate,
     HistoryIn,
     TokenizedHistoryIn,
+    TokenizedHistoryUpdate,
+    WorldUpdate,
     SavedGameCreate,
     SavedGameIdResponse,
     DeepMemoryCreate,
@@ -19,8 +22,11 @@ __all__ = [
     "UserRegister",
     "Token",
     "HistoryEntryIn",
+    "HistoryEntryUpdate",
     "HistoryIn",
     "TokenizedHistoryIn",
+    "TokenizedHistoryUpdate",
+    "WorldUpdate",
     "SavedGameCreate",
     "SavedGameIdResponse",
     "DeepMemoryCreate",
@@ -19,6 +19,11 @@ class HistoryEntryIn(BaseModel):
     """Single-history-entry payload used by the client when posting one entry."""
     entry: str
 
+class HistoryEntryUpdate(BaseModel):
+    """One item of a batch history update: the entry id and its new text."""
+    id: int
+    text: str
+
 class HistoryIn(BaseModel):
     game_id: str
     history: List[str]
@@ -31,6 +36,18 @@ class TokenizedHistoryIn(BaseModel):
     end_index: int
     summary: str
 
+class TokenizedHistoryUpdate(BaseModel):
+    """Partial update of a tokenized chunk; only the fields sent are changed."""
+    summary: Optional[str] = None
+    start_index: Optional[int] = None
+    end_index: Optional[int] = None
+
+class WorldUpdate(BaseModel):
+    """Partial update of a world; only the fields sent are changed."""
+    name: Optional[str] = None
+    preface: Optional[str] = None
+    world_tokens: Optional[str] = None
+
 class SavedGameCreate(BaseModel):
     user_id: int
     world_id: int
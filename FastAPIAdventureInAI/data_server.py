@@ -1,13 +1,37 @@
-﻿import uvicorn
+﻿import asyncio
+import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from config import CORS_ORIGINS
+from config import CORS_ORIGINS, DB_KEEPALIVE_INTERVAL
+from shared.services.orm_service import init_db, keep_pool_alive
+from shared.services.auth_service import AuthStateMiddleware
+from api.ai_client_requests import close_ai_client
 
 # Import routers
 from api.routers import auth_router, users_router, game_ratings_router, worlds_router, deep_memory_router, tokenized_history_router, history_router, saved_games_router
 
-app = FastAPI()
+async def _pool_keepalive():
+    while True:
+        await asyncio.sleep(DB_KEEPALIVE_INTERVAL)
+        await asyncio.to_thread(keep_pool_alive)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema check runs once per process at startup instead of on module import
+    init_db()
+    keepalive_task = asyncio.create_task(_pool_keepalive()) if DB_KEEPALIVE_INTERVAL > 0 else None
+    yield
+    if keepalive_task:
+        keepalive_task.cancel()
+    await close_ai_client()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Resolve the authenticated user once per request (read by get_current_user)
+app.add_middleware(AuthStateMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -1,8 +1,9 @@
 from sqlalchemy.orm import Session
 from aiadventureinpythonconstants import (
     GAME_RATINGS,
-    STORY_SETUPS,
+    STORY_SETUPS_TUPLE,
     STORYTELLER_PROMPT,
+    STORYTELLER_PROMPT_COMPACT,
     SUMMARY_SPLIT_MARKER,
     GAME_DIRECTIVE,
     STOP_TOKENS,
@@ -19,7 +20,8 @@ from aiadventureinpythonconstants import (
     SAFE_PROMPT_LIMIT,
     MAX_WORLD_TOKENS
 )
-from services.orm_service import SessionLocal
+from config import USE_COMPACT_PROMPT
+from shared.services.orm_service import SessionLocal
 from business.models import GameRating, World, AIDirectiveSettings, AccountLevel, User
 
 
@@ -49,15 +51,25 @@ def seed_worlds():
     # Find admin user
     admin = db.query(User).filter_by(username="admin").first()
     admin_id = admin.id if admin else None
-    from aiadventureinpythonconstants import STORY_SETUPS
-    for name, setup in STORY_SETUPS.items():
+    from api.ai_client_requests import ai_count_tokens_batch
+    # Same text the world validation counts (name + world_tokens), one batched request for all setups
+    try:
+        token_counts = ai_count_tokens_batch(
+            [f"{setup.name} {setup.world_tokens}" for setup in STORY_SETUPS_TUPLE], estimate=False
+        )
+    except Exception as e:
+        # Leave token_count empty rather than store an estimate; it is counted when the world is next saved
+        print(f"Could not count world tokens ({e}); seeding worlds without token counts.")
+        token_counts = [None] * len(STORY_SETUPS_TUPLE)
+    for setup, token_count in zip(STORY_SETUPS_TUPLE, token_counts):
         db.add(World(
             user_id=admin_id,
-            name=name,
-            preface=setup["preface"],
-            world_tokens=setup["world_tokens"]
+            name=setup.name,
+            preface=setup.preface,
+            world_tokens=setup.world_tokens,
+            token_count=token_count
         ))
-        print(f"Created world: {name} (user_id={admin_id})")
+        print(f"Created world: {setup.name} (user_id={admin_id})")
     db.commit()
     db.close()
 
@@ -120,9 +132,10 @@ def seed_ai_directive_settings():
     
     # Elite settings (ID=2) - full featured
     elite = db.query(AIDirectiveSettings).filter_by(id=2).first()
+    elite_prompt = STORYTELLER_PROMPT_COMPACT if USE_COMPACT_PROMPT else STORYTELLER_PROMPT
     
     if elite:
-        elite.storyteller_prompt = STORYTELLER_PROMPT
+        elite.storyteller_prompt = elite_prompt
         elite.game_directive = GAME_DIRECTIVE
         elite.summary_split_marker = SUMMARY_SPLIT_MARKER
         elite.stop_tokens = ",".join(STOP_TOKENS)
@@ -142,7 +155,7 @@ def seed_ai_directive_settings():
     else:
         elite = AIDirectiveSettings(
             id=2,
-            storyteller_prompt=STORYTELLER_PROMPT,
+            storyteller_prompt=elite_prompt,
             game_directive=GAME_DIRECTIVE,
             summary_split_marker=SUMMARY_SPLIT_MARKER,
             stop_tokens=",".join(STOP_TOKENS),
@@ -207,7 +220,7 @@ def seed_account_levels():
 
 def seed_admin_user():
     """Create default admin user if it doesn't exist."""
-    from services.auth_service import get_password_hash
+    from shared.services.auth_service import get_password_hash
     db: Session = SessionLocal()
     if db.query(User).filter_by(username="admin").count() > 0:
         print("Admin user already exists. Skipping admin seeding.")
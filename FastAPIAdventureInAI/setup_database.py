@@ -11,9 +11,10 @@ if __name__ == "__main__":
     # Step 1: Create tables
     print("\n[Step 1/2] Creating database tables...")
     try:
-        from services.orm_service import engine
-        from business.models import Base
-        Base.metadata.create_all(bind=engine)
+        # Same schema step the data server runs at startup (tables, newer indexes, server defaults,
+        # tokenized_history_refs backfill for legacy chunks)
+        from shared.services.orm_service import init_db
+        init_db()
         print("✓ Database tables created successfully")
     except Exception as e:
         print(f"✗ Error creating tables: {e}")
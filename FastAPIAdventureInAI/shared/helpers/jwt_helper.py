@@ -0,0 +1,102 @@
+"""
+Fast JWT encode/decode for the HMAC algorithms used by this app.
+The header segment and key are prepared once, so each token costs a single HMAC
+plus base64/json; anything else (other algorithms or headers) falls back to PyJWT.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timezone
+
+import jwt
+from jwt.exceptions import DecodeError, InvalidTokenError, ExpiredSignatureError, ImmatureSignatureError, InvalidIssuedAtError
+
+from config import SECRET_KEY, ALGORITHM
+
+_HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+# Same header bytes PyJWT produces, so tokens issued by either path are interchangeable
+_DIGEST = _HMAC_DIGESTS.get(ALGORITHM)
+_KEY = SECRET_KEY.encode("utf-8")
+_HEADER_SEGMENT = _b64url_encode(
+    json.dumps({"alg": ALGORITHM, "typ": "JWT"}, separators=(",", ":"), sort_keys=True).encode("utf-8")
+)
+
+def _numeric_date(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return value
+
+def encode_token(claims: dict) -> str:
+    """Encode claims as a signed JWT (drop-in for jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM))."""
+    if _DIGEST is None:
+        return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    payload = {key: _numeric_date(value) if key in ("exp", "iat", "nbf") else value for key, value in claims.items()}
+    signing_input = _HEADER_SEGMENT + b"." + _b64url_encode(
+        json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    )
+    signature = hmac.new(_KEY, signing_input, _DIGEST).digest()
+    return (signing_input + b"." + _b64url_encode(signature)).decode("ascii")
+
+def decode_token(token: str) -> dict:
+    """
+    Verify and decode a JWT (drop-in for jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])).
+    Raises ExpiredSignatureError / InvalidTokenError like PyJWT.
+    """
+    if isinstance(token, str):
+        try:
+            token_bytes = token.encode("ascii")
+        except UnicodeEncodeError:
+            # A JWT is base64url and dots only; never strip characters and verify what is left
+            raise InvalidTokenError("Token contains non-ASCII characters")
+    else:
+        token_bytes = token
+    header, _, rest = token_bytes.partition(b".")
+    if _DIGEST is None or header != _HEADER_SEGMENT:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    signing_input, _, signature = token_bytes.rpartition(b".")
+    if not rest or signing_input == header:
+        raise InvalidTokenError("Not enough segments")
+    try:
+        expected = hmac.new(_KEY, signing_input, _DIGEST).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            raise InvalidTokenError("Signature verification failed")
+        payload = json.loads(_b64url_decode(signing_input[len(header) + 1:]))
+    except (ValueError, TypeError) as e:
+        raise InvalidTokenError(str(e))
+    if not isinstance(payload, dict):
+        raise InvalidTokenError("Invalid payload")
+
+    _validate_time_claims(payload)
+    return payload
+
+def _numeric_claim(payload: dict, claim: str, error, message: str) -> int:
+    try:
+        return int(payload[claim])
+    except (ValueError, TypeError, OverflowError):
+        raise error(message) from None
+
+def _validate_time_claims(payload: dict):
+    """Check exp, nbf and iat the way PyJWT does (no leeway), raising the same exceptions."""
+    now = datetime.now(timezone.utc).timestamp()
+    if "iat" in payload and _numeric_claim(payload, "iat", InvalidIssuedAtError, "Issued At claim (iat) must be an integer.") > now:
+        raise ImmatureSignatureError("The token is not yet valid (iat)")
+    if "nbf" in payload and _numeric_claim(payload, "nbf", DecodeError, "Not Before claim (nbf) must be an integer.") > now:
+        raise ImmatureSignatureError("The token is not yet valid (nbf)")
+    if "exp" in payload and _numeric_claim(payload, "exp", DecodeError, "Expiration Time claim (exp) must be an integer.") <= now:
+        raise ExpiredSignatureError("Signature has expired")
@@ -2,42 +2,88 @@
 Authentication service.
 Handles password hashing, JWT token creation, and user authentication.
 """
+import asyncio
+import time
 from datetime import datetime, timedelta, timezone
-from argon2 import PasswordHasher, exceptions
-from jose import jwt
-from sqlalchemy.orm import Session
+from argon2 import PasswordHasher, Type, exceptions, low_level
+from sqlalchemy.orm import Session, make_transient_to_detached
 from jose.exceptions import JWTError
 
 # Security
-import jwt
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
 from fastapi import Request, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer,OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import ACCESS_TOKEN_EXPIRE_MINUTES
 from business.models import User, SavedGame
-from shared.services.orm_service import get_db
+from shared.helpers.jwt_helper import encode_token, decode_token
+from shared.services.orm_service import get_db, SessionLocal, no_expire_on_commit
 
 
 security = HTTPBearer()
 
 # Password hashing setup
-ph = PasswordHasher()
+# Argon2id with the OWASP minimum (19 MiB, 2 passes, 1 lane) instead of the library
+# defaults (64 MiB, 3 passes, 4 lanes). Hashes stored with any other parameters are re-hashed
+# with these on the next login; for library-default hashes that is a deliberate downgrade to
+# the OWASP minimum, so every login costs the same
+ph = PasswordHasher(
+    time_cost=2,
+    memory_cost=19456,
+    parallelism=1,
+    hash_len=32,
+    type=Type.ID
+)
+# Hashes produced by ph; verified straight through the C binding (the parameters are in the hash)
+_ARGON2ID_PREFIX = "$argon2id$"
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Authenticated-user cache: token -> (user column snapshot, expires_at)
+# Skips the JWT decode and the user SELECT for repeat requests with the same token.
+# Code that changes a user row calls clear_user_cache(user_id=...); a change made outside the
+# app (e.g. an account level edited in the database) shows up within USER_CACHE_TTL
+USER_CACHE_TTL = 30  # seconds
+USER_CACHE_MAX = 4096
+_token_user_cache = {}
+
+def clear_user_cache(token: str = None, user_id: int = None):
+    """
+    Invalidate cached authenticated users. Call with the token on logout, or with the
+    user_id when a user's row changes (drops every token of that user).
+    With neither, clears all entries.
+    """
+    if token is not None:
+        _token_user_cache.pop(token, None)
+    elif user_id is not None:
+        for cached_token, (snapshot, _) in list(_token_user_cache.items()):
+            if snapshot["id"] == user_id:
+                _token_user_cache.pop(cached_token, None)
+    else:
+        _token_user_cache.clear()
+
+def _snapshot_user(user: User) -> dict:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+def _user_from_snapshot(db: Session, snapshot: dict) -> User:
+    # Attach a copy to this request's session without a SELECT so relationships still lazy-load
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
 def _get_auth_headers():
     """Generate auth headers for AI server requests"""
     # Use 'system' user for internal server-to-server calls
-    token = jwt.encode({"sub": "system"}, SECRET_KEY, algorithm=ALGORITHM)
+    token = encode_token({"sub": "system"})
     return {"Authorization": f"Bearer {token}"}
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token from Authorization header"""
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
@@ -60,6 +106,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         True if password matches, False otherwise
     """
     try:
+        if hashed_password.startswith(_ARGON2ID_PREFIX):
+            return low_level.verify_secret(hashed_password.encode("ascii"), plain_password.encode("utf-8"), Type.ID)
         return ph.verify(hashed_password, plain_password)
     except exceptions.VerifyMismatchError:
         return False
@@ -92,11 +140,12 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encode_token(to_encode)
 
-def authenticate_user(db: Session, username: str, password: str) -> User | None:
+async def authenticate_user(db: Session, username: str, password: str) -> User | None:
     """
     Authenticate a user by username and password.
+    Argon2 verification (and any re-hash) runs in a worker thread so it does not block the event loop.
     
     Args:
         db: Database session
@@ -107,10 +156,20 @@ def authenticate_user(db: Session, username: str, password: str) -> User | None:
         User object if authentication succeeds, None otherwise
     """
     user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await asyncio.to_thread(verify_password, password, user.password_hash):
         return None
+    # Re-hash passwords stored with other Argon2 parameters (see ph); hash and commit both block
+    if ph.check_needs_rehash(user.password_hash):
+        await asyncio.to_thread(_rehash_password, db, user, password)
     return user
 
+def _rehash_password(db: Session, user: User, password: str):
+    user.password_hash = ph.hash(password)
+    # The caller keeps reading the user (id, username) after this, so don't expire it
+    with no_expire_on_commit(db):
+        db.commit()
+    clear_user_cache(user_id=user.id)
+
 def verify_game_ownership(
     game_id: int,
     user_id: int,
@@ -131,7 +190,7 @@ def verify_game_ownership(
         ValueError: If game not found or not owned by user
     """
     
-    game = db.query(SavedGame).filter(SavedGame.id == game_id).first()
+    game = db.get(SavedGame, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Saved game not found")
     if game.user_id != user_id:
@@ -139,31 +198,122 @@ def verify_game_ownership(
     
     return game
 
+def get_owned_game_row(model, row_id: int, user_id: int, db: Session, not_found_detail: str = "Not found"):
+    """
+    Load a row of a per-game table (StoryHistory, TokenizedHistory, DeepMemory) and check
+    that its saved game belongs to the user, fetching the owner in the same SELECT
+    instead of a second verify_game_ownership lookup.
+    
+    Raises:
+        HTTPException 404 if the row doesn't exist, 403 if the game isn't the user's
+    """
+    result = db.query(model, SavedGame.user_id).join(
+        SavedGame, SavedGame.id == model.saved_game_id
+    ).filter(model.id == row_id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    row, owner_id = result
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Forbidden: not your saved game")
+    
+    return row
+
 def get_user_by_username(db: Session, username: str):
     """Helper function to fetch user by username."""
     return db.query(User).filter(User.username == username).first()
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def _resolve_user_snapshot(token: str, db: Session = None) -> dict:
     """
-    Dependency that validates JWT token and returns the current authenticated user.
+    Validate a JWT token and return a snapshot of its user's columns (cached per token).
     Raises 401 if token is invalid or user not found.
+    If db session is not provided, creates one temporarily.
     """
+    now = time.time()
+    cached = _token_user_cache.get(token)
+    if cached and cached[1] > now:
+        return cached[0]
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except ExpiredSignatureError:
+        _token_user_cache.pop(token, None)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired")
     except (JWTError, InvalidTokenError):
         raise credentials_exception
     
-    user = get_user_by_username(db, username)
-    if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+    need_close = db is None
+    if need_close:
+        db = SessionLocal()
+    try:
+        user = get_user_by_username(db, username)
+        if user is None:
+            raise credentials_exception
+        snapshot = _snapshot_user(user)
+    finally:
+        if need_close:
+            db.close()
+
+    # Never trust a cached entry past the token's own expiry
+    expires_at = now + USER_CACHE_TTL
+    if payload.get("exp") is not None:
+        expires_at = min(expires_at, payload["exp"])
+    if len(_token_user_cache) >= USER_CACHE_MAX:
+        _token_user_cache.clear()
+    _token_user_cache[token] = (snapshot, expires_at)
+    return snapshot
+
+class AuthStateMiddleware:
+    """
+    ASGI middleware that resolves the bearer token once per request and stores the user
+    snapshot (or the 401 to raise) in request.state for get_current_user.
+    Requests without a bearer token and public paths pass through untouched.
+    """
+    PUBLIC_PATHS = frozenset(("/token", "/register/", "/docs", "/redoc", "/openapi.json"))
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] not in self.PUBLIC_PATHS:
+            token = None
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    scheme, _, param = value.decode("latin-1").partition(" ")
+                    if scheme.lower() == "bearer" and param:
+                        token = param
+                    break
+            if token:
+                state = scope.setdefault("state", {})
+                try:
+                    cached = _token_user_cache.get(token)
+                    if cached and cached[1] > time.time():
+                        state["auth_user"] = cached[0]
+                    else:
+                        # Cache miss means a DB lookup; keep it off the event loop
+                        state["auth_user"] = await run_in_threadpool(_resolve_user_snapshot, token)
+                except HTTPException as e:
+                    state["auth_error"] = e
+        await self.app(scope, receive, send)
+
+def get_current_user(request: Request, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    """
+    Dependency that returns the current authenticated user.
+    Uses the user resolved by AuthStateMiddleware when present, otherwise validates the token here.
+    Raises 401 if token is invalid or user not found.
+    """
+    auth_error = getattr(request.state, "auth_error", None)
+    if auth_error is not None:
+        raise auth_error
+    snapshot = getattr(request.state, "auth_user", None)
+    if snapshot is None:
+        # No middleware on this app (e.g. the AI server)
+        snapshot = _resolve_user_snapshot(token, db)
+    return _user_from_snapshot(db, snapshot)
\ No newline at end of file
@@ -2,19 +2,170 @@
 Shared dependencies for FastAPI application.
 Contains database session management and authentication dependencies.
 """
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy import create_engine, exists, insert, inspect, or_, text, update
+from sqlalchemy.schema import CreateColumn
 from jose import JWTError, jwt
 
-from config import DATABASE_URL, SECRET_KEY, ALGORITHM
-from business.models import Base, User
+from config import DATABASE_URL, SECRET_KEY, ALGORITHM, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT
+from business.models import Base, User, SavedGame, StoryHistory, TokenizedHistory, tokenized_history_refs
 
 # Database setup
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,  # fail fast with an error instead of hanging when the pool is exhausted
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=False,  # see keep_pool_alive
+    insertmanyvalues_page_size=1000  # rows per multi-VALUES INSERT for the bulk insert paths
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+
+def init_db():
+    """
+    Create any missing tables, columns, indexes and server-side column defaults, and populate
+    tokenized_history_refs for legacy chunks. Called once at data server startup rather than on import.
+    """
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    # create_all skips tables that already exist, so add any newer indexes explicitly
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    _add_missing_server_defaults()
+    db = SessionLocal()
+    try:
+        backfill_tokenized_history_refs(db)
+    finally:
+        db.close()
+
+def _add_missing_columns():
+    """Add nullable columns that are newer than an existing table (create_all only creates whole tables)."""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD {CreateColumn(column).compile(dialect=engine.dialect)}")
+
+def _add_missing_server_defaults():
+    """Add server-side column defaults (e.g. created_at filled in by the database) missing from existing tables."""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.server_default is None or column.name not in existing or existing[column.name].get("default"):
+                    continue
+                default = column.server_default.arg
+                default_sql = default.compile(dialect=engine.dialect) if hasattr(default, "compile") else f"'{default}'"
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD DEFAULT {default_sql} FOR {column.name}")
+
+def backfill_tokenized_history_refs(db: Session) -> int:
+    """
+    One-time migration: populate tokenized_history_refs for chunks created before the table existed,
+    from their comma-separated history_references. Returns the number of reference rows inserted.
+    """
+    legacy_chunks = db.query(TokenizedHistory.id, TokenizedHistory.history_references).filter(
+        TokenizedHistory.history_references != None,
+        ~exists().where(tokenized_history_refs.c.tokenized_history_id == TokenizedHistory.id)
+    ).all()
+    
+    rows = []
+    for chunk_id, history_references in legacy_chunks:
+        ref_ids = {int(id.strip()) for id in history_references.split(',') if id.strip()}
+        rows.extend({"tokenized_history_id": chunk_id, "story_history_id": ref_id} for ref_id in ref_ids)
+    if not rows:
+        return 0
+    
+    # Skip references to history entries that no longer exist
+    existing_ids = {
+        history_id for (history_id,) in db.query(StoryHistory.id).filter(
+            StoryHistory.id.in_({row["story_history_id"] for row in rows})
+        )
+    }
+    rows = [row for row in rows if row["story_history_id"] in existing_ids]
+    if rows:
+        db.execute(insert(tokenized_history_refs), rows)
+    db.commit()
+    return len(rows)
+
+def keep_pool_alive():
+    """
+    Run SELECT 1 on each idle pooled connection so none goes stale between requests.
+    Replaces a per-checkout pre-ping; call periodically (the data server does so from its lifespan).
+    """
+    connections = []
+    try:
+        for _ in range(engine.pool.checkedin()):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        # A dead connection is invalidated by the failed execute; the pool replaces it on demand
+        pass
+    finally:
+        for connection in connections:
+            connection.close()
+
+@contextmanager
+def no_expire_on_commit(db: Session):
+    """
+    Keep loaded objects populated across commits inside the block, so code that commits
+    mid-way and keeps reading the same objects doesn't trigger a re-SELECT per object.
+    """
+    previous = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        yield db
+    finally:
+        db.expire_on_commit = previous
+
+def touch_saved_game(saved_game_id: int, db: Session):
+    """
+    Bump a saved game's updated_at (one UPDATE, no load) after changing its history,
+    tokenized history or deep memory. The saved game GET ETags are derived from it.
+    """
+    db.execute(
+        update(SavedGame).where(SavedGame.id == saved_game_id).values(updated_at=datetime.now(timezone.utc))
+    )
+
+# A claim older than this is treated as abandoned (worker crashed mid-compression)
+PROCESSING_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+def claim_saved_game(saved_game_id: int, db: Session) -> bool:
+    """
+    Claim a saved game for history compression so only one worker summarizes it at a time.
+    One conditional UPDATE, committed straight away, so no lock is held across the AI calls.
+    Returns False when another worker holds the claim.
+    """
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        update(SavedGame).where(
+            SavedGame.id == saved_game_id,
+            or_(SavedGame.processing_since.is_(None), SavedGame.processing_since < now - PROCESSING_CLAIM_TIMEOUT)
+        ).values(processing_since=now, updated_at=SavedGame.updated_at),  # updated_at unchanged: the ETag stays valid
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def release_saved_game(saved_game_id: int, db: Session):
+    """Release the claim taken by claim_saved_game."""
+    db.execute(
+        update(SavedGame).where(SavedGame.id == saved_game_id).values(processing_since=None, updated_at=SavedGame.updated_at),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
 
 def get_db():
     """
@@ -0,0 +1,49 @@
+"""
+Test configuration: the app is pointed at a throwaway SQLite database before any app
+module (config, orm_service) is imported.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from sqlalchemy import event
+
+from business.models import Base, User, World, GameRating, SavedGame
+from shared.services.orm_service import engine, init_db, SessionLocal
+
+@event.listens_for(engine, "connect")
+def _register_sql_server_functions(dbapi_connection, connection_record):
+    # The models' server defaults call SQL Server's SYSUTCDATETIME()
+    dbapi_connection.create_function("sysutcdatetime", 0, lambda: datetime.utcnow().isoformat(" "))
+
+@pytest.fixture
+def db():
+    """A session on a freshly initialized schema, dropped again after the test."""
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def game(db):
+    """A saved game (with its owner, world and rating) to attach history to."""
+    user = User(username="player", password_hash="unused", account_level_id=1)
+    rating = GameRating(name="Family Friendly", ai_prompt="the recent story")
+    world = World(name="Test World", preface="preface", world_tokens="world tokens")
+    db.add_all([user, rating, world])
+    db.flush()
+    saved_game = SavedGame(user_id=user.id, world_id=world.id, rating_id=rating.id, player_name="Hero", player_gender="Other")
+    db.add(saved_game)
+    db.commit()
+    return saved_game
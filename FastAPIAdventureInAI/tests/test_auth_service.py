@@ -0,0 +1,27 @@
+import asyncio
+
+from argon2 import PasswordHasher, extract_parameters
+
+from business.models import User
+from shared.services.auth_service import authenticate_user, create_access_token, ph, _resolve_user_snapshot
+
+def test_login_rehashes_library_default_hash_to_configured_parameters(db):
+    db.add(User(username="legacy", password_hash=PasswordHasher().hash("secret"), account_level_id=1))
+    db.commit()
+    
+    user = asyncio.run(authenticate_user(db, "legacy", "secret"))
+    assert user is not None
+    parameters = extract_parameters(user.password_hash)
+    assert (parameters.memory_cost, parameters.time_cost, parameters.parallelism) == (ph.memory_cost, ph.time_cost, ph.parallelism)
+    assert asyncio.run(authenticate_user(db, "legacy", "secret")).id == user.id
+    assert asyncio.run(authenticate_user(db, "legacy", "wrong")) is None
+
+def test_rehash_drops_cached_snapshots_of_the_user(db):
+    db.add(User(username="legacy", password_hash=PasswordHasher().hash("secret"), account_level_id=1))
+    db.commit()
+    token = create_access_token({"sub": "legacy"})
+    old_hash = _resolve_user_snapshot(token, db)["password_hash"]
+    
+    user = asyncio.run(authenticate_user(db, "legacy", "secret"))
+    assert user.password_hash != old_hash
+    assert _resolve_user_snapshot(token, db)["password_hash"] == user.password_hash
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from business.models import SavedGame, StoryHistory, TokenizedHistory, tokenized_history_refs
+from business.schemas import HistoryEntryIn
+from shared.services.orm_service import init_db, claim_saved_game, release_saved_game
+from api.services import history_service, memory_service
+from api.services.history_service import (
+    MAX_HISTORY_BATCH_SIZE,
+    perform_create_history_entry,
+    perform_create_history_entries,
+    perform_delete_history_entry,
+    check_and_tokenize_history
+)
+
+def _add_history(db, game, count):
+    entries = [StoryHistory(saved_game_id=game.id, entry_index=i, text=f"entry {i}", token_count=10, is_tokenized=1) for i in range(count)]
+    db.add_all(entries)
+    db.commit()
+    return entries
+
+def test_delete_history_entry_of_legacy_chunk(db, game):
+    entries = _add_history(db, game, 3)
+    # A chunk from before tokenized_history_refs existed: only the CSV column lists its entries
+    chunk = TokenizedHistory(
+        saved_game_id=game.id, start_index=0, end_index=1, summary="summary", token_count=5,
+        history_references=f"{entries[0].id},{entries[1].id}"
+    )
+    db.add(chunk)
+    db.commit()
+    chunk_id = chunk.id
+    assert db.query(tokenized_history_refs).count() == 0
+    
+    # Data server startup backfills the reference rows
+    init_db()
+    
+    perform_delete_history_entry(entries[0].id, db, game.user)
+    db.expire_all()
+    assert db.get(TokenizedHistory, chunk_id).history_references == str(entries[1].id)
+    
+    perform_delete_history_entry(entries[1].id, db, game.user)
+    db.expire_all()
+    assert db.get(TokenizedHistory, chunk_id) is None
+    assert db.query(StoryHistory).count() == 1
+
+def test_saved_game_claim_is_exclusive(db, game):
+    updated_at = game.updated_at
+    assert claim_saved_game(game.id, db)
+    assert not claim_saved_game(game.id, db)
+    release_saved_game(game.id, db)
+    assert claim_saved_game(game.id, db)
+    release_saved_game(game.id, db)
+    # Claiming is not a change to the game, so its ETag stays valid
+    db.expire_all()
+    assert db.get(SavedGame, game.id).updated_at == updated_at
+
+def test_check_and_tokenize_history_skips_claimed_game(db, game, monkeypatch):
+    calls = []
+    monkeypatch.setattr(history_service, "_check_and_tokenize_history", lambda *args: calls.append(args))
+    assert claim_saved_game(game.id, db)
+    check_and_tokenize_history(game.id, db)
+    assert calls == []
+    
+    release_saved_game(game.id, db)
+    check_and_tokenize_history(game.id, db)
+    assert len(calls) == 1
+    # Released again afterwards
+    assert claim_saved_game(game.id, db)
+
+def _append_without_ai(monkeypatch):
+    async def count_tokens_async(texts, username=None):
+        return [len(text) for text in texts]
+    monkeypatch.setattr(history_service, "ai_count_tokens_batch_async", count_tokens_async)
+    monkeypatch.setattr(history_service, "check_and_tokenize_history", lambda *args, **kwargs: None)
+    monkeypatch.setattr(memory_service, "ai_calculate_token_count", lambda text, username=None: len(text))
+
+def _entry_indexes(db, game):
+    return [index for (index,) in db.query(StoryHistory.entry_index).filter(
+        StoryHistory.saved_game_id == game.id
+    ).order_by(StoryHistory.id)]
+
+def test_append_after_entry_index_zero(db, game, monkeypatch):
+    _append_without_ai(monkeypatch)
+    _add_history(db, game, 1)
+    
+    asyncio.run(perform_create_history_entries([HistoryEntryIn(entry="second")], game.id, db, game.user))
+    assert _entry_indexes(db, game) == [0, 1]
+    asyncio.run(perform_create_history_entry(HistoryEntryIn(entry="third"), game.id, db, game.user))
+    assert _entry_indexes(db, game) == [0, 1, 2]
+
+def test_append_batch_is_capped(db, game, monkeypatch):
+    _append_without_ai(monkeypatch)
+    entries = [HistoryEntryIn(entry="entry")] * (MAX_HISTORY_BATCH_SIZE + 1)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(perform_create_history_entries(entries, game.id, db, game.user))
+    assert error.value.status_code == 400
+    assert _entry_indexes(db, game) == []
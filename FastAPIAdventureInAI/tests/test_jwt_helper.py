@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from jwt.exceptions import InvalidTokenError, ExpiredSignatureError, ImmatureSignatureError
+
+from config import SECRET_KEY, ALGORITHM
+from shared.helpers.jwt_helper import encode_token, decode_token
+
+def _in(seconds):
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+def test_round_trip():
+    claims = {"sub": "player", "exp": _in(60)}
+    payload = decode_token(encode_token(claims))
+    assert payload == {"sub": "player", "exp": int(claims["exp"].timestamp())}
+
+def test_interoperates_with_pyjwt():
+    claims = {"sub": "player", "iat": _in(-10), "exp": _in(60)}
+    assert jwt.decode(encode_token(claims), SECRET_KEY, algorithms=[ALGORITHM]) == decode_token(encode_token(claims))
+    assert decode_token(jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM))["sub"] == "player"
+
+def test_rejects_tampered_signature():
+    header, payload, signature = encode_token({"sub": "player"}).split(".")
+    tampered = "A" if signature[0] != "A" else "B"
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.{tampered}{signature[1:]}")
+
+def test_rejects_tampered_payload():
+    header, _, signature = encode_token({"sub": "player"}).split(".")
+    _, payload, _ = encode_token({"sub": "admin"}).split(".")
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.{signature}")
+
+@pytest.mark.parametrize("algorithm", ["HS512" if ALGORITHM != "HS512" else "HS256", "none"])
+def test_rejects_other_algorithm_header(algorithm):
+    token = jwt.encode({"sub": "player"}, SECRET_KEY if algorithm != "none" else None, algorithm=algorithm)
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+def test_rejects_expired_token():
+    with pytest.raises(ExpiredSignatureError):
+        decode_token(encode_token({"sub": "player", "exp": _in(-1)}))
+
+@pytest.mark.parametrize("claim", ["nbf", "iat"])
+def test_rejects_token_not_yet_valid(claim):
+    with pytest.raises(ImmatureSignatureError):
+        decode_token(encode_token({"sub": "player", claim: _in(60)}))
+
+def test_rejects_non_ascii_token():
+    token = encode_token({"sub": "player"})
+    # Stripping the character would leave a valid token; it must be rejected instead
+    with pytest.raises(InvalidTokenError):
+        decode_token(token[:10] + "é" + token[10:])
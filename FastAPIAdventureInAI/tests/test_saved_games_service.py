@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from business.models import StoryHistory
+from business.schemas import HistoryEntryUpdate
+from api.services import history_service, memory_service
+from api.services.history_service import perform_update_history_entry, perform_update_history_entries, perform_delete_history_entry
+from api.services.memory_service import ensure_history_token_counts
+from api.services.saved_games_service import perform_list_tokenized_history
+
+def _conditional_get(game, db, etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return perform_list_tokenized_history(game.id, Request({"type": "http", "headers": headers}), db, game.user)
+
+@pytest.fixture
+def history(db, game, monkeypatch):
+    monkeypatch.setattr(memory_service, "ai_count_tokens_batch", lambda texts, username=None: [len(text) for text in texts])
+    monkeypatch.setattr(memory_service, "ai_calculate_token_count", lambda text, username=None: len(text))
+    async def count_tokens_async(texts, username=None):
+        return [len(text) for text in texts]
+    monkeypatch.setattr(history_service, "ai_count_tokens_batch_async", count_tokens_async)
+    entries = [StoryHistory(saved_game_id=game.id, entry_index=i, text=f"entry {i}") for i in range(2)]
+    db.add_all(entries)
+    db.commit()
+    return entries
+
+@pytest.mark.parametrize("write", [
+    lambda game, history, db: ensure_history_token_counts(game.id, db),
+    lambda game, history, db: perform_update_history_entry(history[0].id, {"text": "changed"}, db, game.user),
+    lambda game, history, db: asyncio.run(perform_update_history_entries([HistoryEntryUpdate(id=history[1].id, text="changed")], db, game.user)),
+    lambda game, history, db: perform_delete_history_entry(history[0].id, db, game.user),
+], ids=["token_counts", "update", "batch_update", "delete"])
+def test_history_write_invalidates_etag(db, game, history, write):
+    etag = _conditional_get(game, db).headers["ETag"]
+    assert _conditional_get(game, db, etag).status_code == 304
+    
+    write(game, history, db)
+    db.expire_all()
+    response = _conditional_get(game, db, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag